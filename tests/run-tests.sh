@@ -2,19 +2,29 @@
 set -euo pipefail
 
 # Run tests in Vagrant VM (non-destructive first, then destructive)
-# Usage: tests/run-tests.sh [--destroy]
+# Usage: tests/run-tests.sh [--destroy] [--jobs N]
 #  --destroy  Destroy the VM before starting (fresh run)
+#  --jobs N   Run non-destructive tests across N forked workers (coverage only sees the parent)
 
 cd "$(dirname "$0")"
 
 DESTROY=false
-for arg in "$@"; do
-  case "$arg" in
+JOBS=1
+while [ $# -gt 0 ]; do
+  case "$1" in
     --destroy) DESTROY=true ;;
-    *) echo "Unknown option: $arg" >&2; exit 2 ;;
+    --jobs) shift; JOBS="${1:?--jobs requires a number}" ;;
+    --jobs=*) JOBS="${1#--jobs=}" ;;
+    *) echo "Unknown option: $1" >&2; exit 2 ;;
   esac
+  shift
 done
 
+if ! [[ $JOBS =~ ^[1-9][0-9]*$ ]]; then
+  echo "--jobs must be a positive integer, got: $JOBS" >&2
+  exit 2
+fi
+
 if $DESTROY; then
   vagrant destroy -f || true
 fi
@@ -24,8 +34,8 @@ vagrant up
 set -o pipefail
 echo "=== Running test suite ==="
 # Run the test suite under coverage as root inside the VM so destructive tests can access ZFS
-# Use sudo -E to preserve the environment variables (RUN_TESTS, PYTHONPATH)
-vagrant ssh -c "cd /vagrant && sudo -E env RUN_TESTS=1 PYTHONPATH=/vagrant:/vagrant/tests/suites bash -lc 'python3 -m coverage run --branch --source=zfs_simple_backup_restore tests/suites/tests.py'"
+# Use sudo -E to preserve the environment variables (RUN_TESTS, ZFS_DESTRUCTIVE_TESTS, PYTHONPATH)
+vagrant ssh -c "cd /vagrant && sudo -E env RUN_TESTS=1 ZFS_DESTRUCTIVE_TESTS=1 TEST_JOBS=$JOBS PYTHONPATH=/vagrant:/vagrant/tests/suites bash -lc 'python3 -m coverage run --branch --source=zfs_simple_backup_restore tests/suites/tests.py'"
 
 echo
 echo "=== Coverage: missing lines ==="
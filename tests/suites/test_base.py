@@ -1,47 +1,68 @@
 #!/usr/bin/env python3
+import importlib.util
 import os
+import pickle
 import sys
 import shutil
 import subprocess
 import tempfile
+import time
+import unittest
 from contextlib import contextmanager
 from pathlib import Path
+from types import SimpleNamespace
 from typing import Any, Iterable, Iterator, Sequence
 
+# Project root is three directories up from this file; resolved once at import
+_PROJECT_ROOT = Path(__file__).resolve().parents[2]
+
 
 class TestBase:
+    # RAM-backed location for the scratch root, used when present and writable
+    shm_dir: str = "/dev/shm"
+
     def __init__(self) -> None:
-        self._temp_dirs: list[str] = []
+        # One scratch root per suite run; tests get cheap subdirectories under it and the
+        # whole tree is removed once in cleanup() instead of mkdtemp/rmtree per test.
+        # TemporaryDirectory also reaps it at interpreter exit if cleanup() never runs.
+        self._scratch = tempfile.TemporaryDirectory(prefix="zsbr-suite-", dir=self._scratch_parent(), ignore_cleanup_errors=True)
+        self._root = Path(self._scratch.name)
+        self._scratch_seq = 0
         # Provide a shared logger for all suites. Prefer the project's Logger; fall back to StdLogger.
         self.logger = self._make_logger()
         self.success = "✅"
         self.failure = "🚨"
 
+    @classmethod
+    def _scratch_parent(cls) -> str | None:
+        """Return shm_dir when it is a writable directory, else None (the default temp dir)."""
+        if os.path.isdir(cls.shm_dir) and os.access(cls.shm_dir, os.W_OK | os.X_OK):
+            return cls.shm_dir
+        return None
+
     def _make_logger(self):
         # Try to import the project's Logger by adding project root to sys.path if necessary.
-        # Project root is three directories up from this file.
-        project_root = Path(__file__).parent.parent.parent
-        if str(project_root) not in sys.path:
-            sys.path.insert(0, str(project_root))
+        if str(_PROJECT_ROOT) not in sys.path:
+            sys.path.insert(0, str(_PROJECT_ROOT))
 
-        try:
+        # Probe with find_spec rather than try/except ImportError: no failed import to unwind
+        if importlib.util.find_spec("zfs_simple_backup_restore") is not None:
             from zfs_simple_backup_restore import Logger  # type: ignore
 
             return Logger(verbose=True)
-        except Exception:
 
-            class _StdLogger:
-                def always(self, msg: str) -> None:
-                    print(f"[INFO]  {msg}")
+        class _StdLogger:
+            def always(self, msg: str) -> None:
+                print(f"[INFO]  {msg}")
 
-                def error(self, msg: str) -> None:
-                    print(f"[ERROR] {msg}")
+            def error(self, msg: str) -> None:
+                print(f"[ERROR] {msg}")
 
-                # Compat for tests that might call info()
-                def info(self, msg: str) -> None:
-                    print(f"[INFO]  {msg}")
+            # Compat for tests that might call info()
+            def info(self, msg: str) -> None:
+                print(f"[INFO]  {msg}")
 
-            return _StdLogger()
+        return _StdLogger()
 
     # Minimal standardized output
     def test_result(self, description: str, ok: bool) -> None:
@@ -79,20 +100,30 @@ class TestBase:
         if got != expected:
             raise AssertionError(msg or f"Expected {expected!r}, got {got!r}")
 
+    @contextmanager
+    def assert_raises(self, exc_type: type[BaseException], msg: str | None = None) -> Iterator[SimpleNamespace]:
+        """Require the block to raise `exc_type`; the caught exception is exposed as `.value`."""
+        info = SimpleNamespace(value=None)
+        try:
+            yield info
+        except exc_type as e:
+            info.value = e
+        else:
+            raise AssertionError(msg or f"Expected {exc_type.__name__}")
+
     # Temp directory management
-    def mktemp_dir(self, prefix: str = "testbase-") -> str:
-        path = tempfile.mkdtemp(prefix=prefix)
-        self._temp_dirs.append(path)
+    def scratch(self, name: str = "testbase-") -> Path:
+        """Create and return a fresh, uniquely numbered directory under the suite root."""
+        self._scratch_seq += 1
+        path = self._root / f"{name}{self._scratch_seq}"
+        path.mkdir()
         return path
 
-    def rm_dir(self, path: str) -> None:
-        shutil.rmtree(path, ignore_errors=True)
-        if path in self._temp_dirs:
-            self._temp_dirs.remove(path)
-
     @contextmanager
     def tempdir(self, prefix: str = "testbase-") -> Iterator[Path]:
-        """Context-managed temporary directory that is removed immediately on exit.
+        """Context-managed scratch directory under the suite root.
+
+        The directory is left in place on exit and removed with the root in cleanup().
 
         Usage:
             with self.tempdir(prefix="case-") as tmp:
@@ -100,11 +131,7 @@ class TestBase:
                 ...
         """
 
-        p = Path(self.mktemp_dir(prefix=prefix))
-        try:
-            yield p
-        finally:
-            self.rm_dir(str(p))
+        yield self.scratch(prefix)
 
     @contextmanager
     def temp_chdir(self, path: str | Path):
@@ -120,25 +147,77 @@ class TestBase:
     def make_chain_manager(self, prefix: str = "chain-temp-") -> tuple[Path, object]:
         """Create a temporary directory and return (Path, ChainManager instance).
 
-        The temporary directory is registered for cleanup via TestBase.mktemp_dir.
+        The directory lives under the suite scratch root and is removed by cleanup().
         """
-        tmp = Path(self.mktemp_dir(prefix=prefix))
+        tmp = self.scratch(prefix)
         # Import here to avoid import-time requirements when TestBase is imported standalone
         from zfs_simple_backup_restore import ChainManager  # type: ignore
 
         return tmp, ChainManager(tmp, "TEST", self.logger)
 
     def create_chain_dirs(self, root: Path, names: list[str]) -> None:
-        """Create chain directories under root with given names."""
-        for n in names:
-            (root / n).mkdir(parents=True, exist_ok=True)
+        """Create chain directories under root (a fresh scratch dir) with given names.
+
+        Like write_files, every mkdir resolves relative to one fd on root.
+        """
+        dir_fd = os.open(root, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            for n in names:
+                os.mkdir(n, dir_fd=dir_fd)
+        finally:
+            os.close(dir_fd)
 
     def write_file(self, path: Path, content: bytes | str) -> None:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        if isinstance(content, str):
-            path.write_text(content)
-        else:
-            path.write_bytes(content)
+        """Write a fixture file with a single open/write/close, creating parents on demand.
+
+        Empty content skips the write entirely so zero-byte fixtures cost one open/close.
+        """
+        data = content.encode() if isinstance(content, str) else content
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        try:
+            fd = os.open(path, flags, 0o644)
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(path, flags, 0o644)
+        try:
+            if data:
+                os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def write_files(self, directory: Path, files: dict[str, bytes | str], ages: dict[str, float] | None = None) -> None:
+        """Create several fixture files under one existing directory.
+
+        Names are relative to `directory` and may include subdirectories that already exist.
+        `ages` optionally backdates some of those files (name -> seconds old). The directory
+        is opened once and every open resolves relative to that fd, so the kernel walks the
+        parent path a single time for the whole batch; backdating goes through the file's
+        own fd (futimens) before it is closed, with no second path lookup.
+        """
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        ages = ages or {}
+        now = time.time()
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            for name, content in files.items():
+                data = content.encode() if isinstance(content, str) else content
+                fd = os.open(name, flags, 0o644, dir_fd=dir_fd)
+                try:
+                    if data:
+                        os.write(fd, data)
+                    if name in ages:
+                        os.utime(fd, (now - ages[name], now - ages[name]))
+                finally:
+                    os.close(fd)
+        finally:
+            os.close(dir_fd)
+
+    def assert_no_tmp_files(self, root: Path, msg: str | None = None) -> None:
+        """Fail on the first *.tmp file found anywhere under root (single os.walk pass, early exit)."""
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if name.endswith(".tmp"):
+                    raise AssertionError(msg or f"Found leftover tmp file: {os.path.join(dirpath, name)}")
 
     def assert_file_exists(self, path: Path, msg: str | None = None) -> None:
         if not path.exists():
@@ -153,35 +232,6 @@ class TestBase:
         if actual != expected:
             raise AssertionError(msg or f"File {path} content mismatch: expected {expected!r}, got {actual!r}")
 
-    def set_logger_logfile(self, logger: Any, path: Path) -> None:
-        """Prepare and attach a log file to a Logger instance for tests.
-
-        This ensures parent directories exist, closes any existing logger.log_file,
-        sets logger.log_file_path, and opens the file for append assigning
-        logger.log_file to the file object.
-        """
-        path.parent.mkdir(parents=True, exist_ok=True)
-        # Close any existing file handle if present
-        try:
-            lf = getattr(logger, "log_file", None)
-            if lf:
-                try:
-                    lf.close()
-                except Exception:
-                    pass
-        except Exception:
-            pass
-
-        logger.log_file_path = str(path)
-        try:
-            logger.log_file = open(path, "a")
-        except Exception:
-            logger.log_file = None
-
-    def read_log(self, path: Path) -> str:
-        """Return the contents of a log file as text."""
-        return path.read_text()
-
     def assert_file_text_equal_stripped(self, path: Path, expected: str, msg: str | None = None) -> None:
         """Assert that file content equals expected after stripping whitespace/newlines."""
         actual = path.read_text().strip()
@@ -258,27 +308,63 @@ class TestBase:
 
     # Cleanup hook (temp dirs, etc.)
     def cleanup(self) -> None:
-        for d in list(self._temp_dirs):
-            self.rm_dir(d)
+        self._scratch.cleanup()
+
+    # Simple monkeypatch helpers
+    def on_patch(self) -> None:
+        """Called when patches are applied and again after they are undone.
+
+        Suites override this to drop caches that depend on patched state.
+        """
 
-    # Simple monkeypatch helper
     @contextmanager
-    def patched(self, obj: Any, attr: str, value: Any) -> Iterator[None]:
-        """Temporarily set obj.attr to value and restore afterwards."""
-        had_attr = hasattr(obj, attr)
-        original = getattr(obj, attr, None)
-        setattr(obj, attr, value)
+    def patch_many(self, mapping: dict[tuple[Any, str], Any]) -> Iterator[None]:
+        """Temporarily set several obj.attr values ({(obj, attr): value}) in one pass."""
+        missing = object()
+        saved = [(obj, attr, getattr(obj, attr, missing)) for obj, attr in mapping]
+        self.on_patch()
+        for (obj, attr), value in mapping.items():
+            setattr(obj, attr, value)
         try:
             yield
         finally:
-            if had_attr:
-                setattr(obj, attr, original)
-            else:
-                # If the attribute didn't exist before, try to delete it; if deletion fails, restore to original
+            for obj, attr, original in reversed(saved):
+                if original is not missing:
+                    setattr(obj, attr, original)
+                    continue
+                # If the attribute didn't exist before, try to delete it; if deletion fails, set it to None
                 try:
                     delattr(obj, attr)
                 except Exception:
-                    setattr(obj, attr, original)
+                    setattr(obj, attr, None)
+            self.on_patch()
+
+    def patched(self, obj: Any, attr: str, value: Any):
+        """Temporarily set obj.attr to value and restore afterwards."""
+        return self.patch_many({(obj, attr): value})
+
+    @contextmanager
+    def patched_module(self, name: str, module: Any) -> Iterator[None]:
+        """Temporarily bind sys.modules[name]; None makes `import name` raise ImportError."""
+        missing = object()
+        original = sys.modules.get(name, missing)
+        sys.modules[name] = module
+        try:
+            yield
+        finally:
+            if original is missing:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = original
+
+    @staticmethod
+    def raising(exc: BaseException):
+        """Return a callable that accepts any arguments and raises exc."""
+
+        def fake(*args, **kwargs):
+            raise exc
+
+        return fake
 
     @contextmanager
     def patched_pipeline(self, run_side_effect=None):
@@ -289,7 +375,7 @@ class TestBase:
         side-effect callable may be provided with signature
             fn(source_cmd, tmpfile, rate, compression_cmd)
         """
-        from unittest.mock import Mock, patch
+        from unittest.mock import Mock
 
         def default_side_effect(source_cmd, tmpfile, rate, compression_cmd):
             # ensure parent exists and write a small file to simulate pipeline output
@@ -297,41 +383,104 @@ class TestBase:
             Path(tmpfile).write_bytes(b"fake backup data")
 
         side = run_side_effect or default_side_effect
-        with patch("zfs_simple_backup_restore.ProcessPipeline") as mock_pipeline_class:
-            mock_pipeline = Mock()
-            mock_pipeline.run_with_rate_limit.side_effect = side
-            mock_pipeline_class.return_value = mock_pipeline
-            try:
-                yield mock_pipeline
-            finally:
-                # cleanup any leftover tmpfiles the side_effect may have created is left to the caller's tempdir
-                pass
+        mock_pipeline = Mock()
+        mock_pipeline.run_with_rate_limit.side_effect = side
+        # Swap the module attribute directly; cleanup of any tmpfiles is left to the caller's tempdir
+        with self.patched(sys.modules["zfs_simple_backup_restore"], "ProcessPipeline", lambda logger: mock_pipeline):
+            yield mock_pipeline
 
-    # Generic test runner: takes a list of (name, callable) and a logger with .always/.error
-    def run_tests(self, tests: Sequence[tuple[str, Any]], logger: Any) -> bool:
-        passed = 0
-        failed = 0
+    # Tests whose names start with one of these always run serially in the parent process.
+    serial_prefixes: tuple[str, ...] = ("test_destructive_",)
 
-        for name, fn in tests:
-            try:
-                fn()
-                # Prefer structured logger; fall back to stdout
-                msg = f"{name} ... {self.success} Pass"
+    def _run_one(self, fn: Any, catch: type[BaseException] = Exception) -> tuple[str, str]:
+        """Run a single test and return (status, message); status is ".", "s" or "F".
+
+        Workers pass catch=BaseException so SystemExit/KeyboardInterrupt count as failures
+        instead of unwinding out of the forked child.
+        """
+        try:
+            fn()
+        except unittest.SkipTest as e:
+            return "s", str(e)
+        except catch as e:
+            return "F", str(e) or type(e).__name__
+        return ".", ""
+
+    def _run_forked(self, tests: Sequence[tuple[str, Any]], jobs: int) -> list[tuple[str, str, str]]:
+        """Run tests round-robin across `jobs` forked workers and return their results.
+
+        Processes rather than threads: tests patch module globals (subprocess.run,
+        shutil.which, ...) which would leak between threads sharing one interpreter.
+        """
+        sys.stdout.flush()
+        sys.stderr.flush()
+        workers: list[tuple[int, int, Sequence[tuple[str, Any]]]] = []
+        for i in range(jobs):
+            chunk = tests[i::jobs]
+            if not chunk:
+                continue
+            r, w = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                # The child must never return into the caller's frames (run_all, main()'s
+                # cleanup/teardown), so every path out of here ends in os._exit.
+                status = 1
                 try:
-                    logger.always(msg)
-                except Exception:
-                    print(msg)
-                passed += 1
-            except Exception as e:
-                msg = f"{name} ... {self.failure} Failed: {e}"
+                    os.close(r)
+                    # Own scratch root per worker so numbered subdirectories never collide.
+                    self._root = self._root / f"worker-{i}"
+                    self._root.mkdir()
+                    results = [(name, *self._run_one(fn, catch=BaseException)) for name, fn in chunk]
+                    with os.fdopen(w, "wb") as f:
+                        pickle.dump(results, f)
+                    status = 0
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os._exit(status)
+            os.close(w)
+            workers.append((pid, r, chunk))
+
+        results: list[tuple[str, str, str]] = []
+        for pid, r, chunk in workers:
+            with os.fdopen(r, "rb") as f:
                 try:
-                    logger.error(msg)
-                except Exception:
-                    print(msg)
-                failed += 1
-
-        print(f"\n=== TEST RESULTS: {passed} {self.success} Pass, {failed} {self.failure} Failed ===")
-        return failed == 0
+                    results.extend(pickle.load(f))
+                except EOFError:
+                    results.extend((name, "F", "test worker exited unexpectedly") for name, _ in chunk)
+            os.waitpid(pid, 0)
+        order = {name: n for n, (name, _) in enumerate(tests)}
+        results.sort(key=lambda res: order[res[0]])
+        return results
+
+    # Generic test runner: takes a list of (name, callable). Passing tests print a single
+    # dot (like `pytest -q`), skipped tests an "s"; failures are collected and reported
+    # once after the run. Tests skip themselves by raising unittest.SkipTest. With jobs > 1
+    # tests are spread over forked workers; serial_prefixes tests still run in this process.
+    def run_tests(self, tests: Sequence[tuple[str, Any]], jobs: int = 1) -> bool:
+        results: list[tuple[str, str, str]] = []
+        serial = list(tests)
+        if jobs > 1:
+            parallel = [t for t in tests if not t[0].startswith(self.serial_prefixes)]
+            serial = [t for t in tests if t[0].startswith(self.serial_prefixes)]
+            results = self._run_forked(parallel, jobs)
+            sys.stdout.write("".join(status for _, status, _ in results))
+
+        for name, fn in serial:
+            status, msg = self._run_one(fn)
+            results.append((name, status, msg))
+            sys.stdout.write(status)
+        sys.stdout.write("\n")
+
+        skipped = [(name, msg) for name, status, msg in results if status == "s"]
+        failures = [(name, msg) for name, status, msg in results if status == "F"]
+        for name, reason in skipped:
+            print(f"{name} ... skipped: {reason}")
+        for name, e in failures:
+            print(f"{name} ... {self.failure} Failed: {e}")
+        passed = len(results) - len(failures) - len(skipped)
+        print(f"\n=== TEST RESULTS: {passed} {self.success} Pass, {len(failures)} {self.failure} Failed, {len(skipped)} Skipped ===")
+        return not failures
 
     # Auto-discovery of tests: run all instance methods named test_*
     def discover_tests(self) -> list[tuple[str, Any]]:
@@ -349,24 +498,25 @@ class TestBase:
         tests.sort(key=lambda x: x[0])
         return tests
 
-    def run_all(self, logger: Any | None = None) -> bool:
-        tests = self.discover_tests()
-        # Prefer provided logger, then instance attribute, then minimal stdout logger
-        if logger is None:
-            logger = getattr(self, "logger", None)
-        if logger is None:
+    def run_all(self) -> bool:
+        # TEST_JOBS=N opts into running independent tests across N forked workers.
+        jobs = int(os.environ.get("TEST_JOBS", "1"))
+        return self.run_tests(self.discover_tests(), jobs=jobs)
 
-            class _StdLogger:
-                def always(self, msg: str) -> None:
-                    print(msg)
+    # ===== Destructive-suite helpers =====
+    # Destructive tests create and destroy real pools; they only run when this is set to 1
+    destructive_env_var: str = "ZFS_DESTRUCTIVE_TESTS"
 
-                def error(self, msg: str) -> None:
-                    print(msg)
+    def destructive_enabled(self) -> bool:
+        return os.environ.get(self.destructive_env_var) == "1"
 
-            logger = _StdLogger()
-        return self.run_tests(tests, logger)
+    def destructive_ctx(self) -> dict:
+        """Return the destructive context, skipping the calling test when none was set up."""
+        ctx = getattr(self, "ctx", None)
+        if not ctx:
+            raise unittest.SkipTest(f"destructive tests disabled (set {self.destructive_env_var}=1)")
+        return ctx
 
-    # ===== Destructive-suite helpers =====
     def ensure_root_or_exit(self) -> None:
         if os.geteuid() != 0:
             print("ERROR: Destructive tests must be run as root")
@@ -424,17 +574,40 @@ class TestBase:
             except Exception:
                 pass
 
+    def mount_restored(self, dataset: str) -> Path:
+        """Ensure a restored dataset is mounted and return its mountpoint."""
+        from zfs_simple_backup_restore import ZFS  # type: ignore
+
+        props = ZFS.get_props(dataset, ["mountpoint", "mounted"])
+        mount_point = Path(props["mountpoint"])
+        mount_point.mkdir(parents=True, exist_ok=True)
+        if props["mounted"] != "yes":
+            self.run_cmd(["zfs", "mount", dataset])
+        return mount_point
+
+    def create_restore_pool(self, ctx: dict) -> None:
+        """(Re)create the empty file-backed pool that destructive tests restore into."""
+        self.run_cmd(["zpool", "destroy", ctx["restore_pool"]], check=False)
+        if os.path.exists(ctx["restore_pool_file"]):
+            os.unlink(ctx["restore_pool_file"])
+        self.run_cmd(["truncate", "-s", "1G", ctx["restore_pool_file"]])
+        self.run_cmd(["zpool", "create", ctx["restore_pool"], ctx["restore_pool_file"]])
+
     def destructive_env_setup(self) -> dict:
-        """Common setup for destructive suites; returns a context dict."""
+        """Common setup for destructive suites; returns a context dict.
+
+        The restore pool is created once here and shared by all destructive tests.
+        """
         self.ensure_root_or_exit()
         self.load_zfs_module()
         dataset = self.setup_test_pool()
         ctx = {
             "dataset": dataset,
-            "backup_dir": self.mktemp_dir(prefix="destructive-backup-"),
+            "backup_dir": str(self.scratch("destructive-backup-")),
             "restore_pool": "restored",
             "restore_pool_file": "/tmp/restored_pool.img",
         }
+        self.create_restore_pool(ctx)
         return ctx
 
     def destructive_env_teardown(self, ctx: dict) -> None:
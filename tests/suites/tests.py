@@ -7,7 +7,18 @@ These tests mock external commands and don't require actual ZFS pools.
 import sys
 import os
 import shutil
+import builtins
+import fcntl
+import functools
+import io
+import subprocess
+import tempfile
+import types
+import unittest
+from contextlib import contextmanager, nullcontext
+from dataclasses import replace
 from pathlib import Path
+from unittest.mock import Mock
 
 from test_base import TestBase
 
@@ -20,6 +31,7 @@ if os.environ.get("RUN_TESTS") != "1":
 # and expects the project package to be installed in the test environment.
 
 # Import project symbols used by the tests
+import zfs_simple_backup_restore as mod
 from zfs_simple_backup_restore import (
     Args,
     BaseManager,
@@ -34,18 +46,193 @@ from zfs_simple_backup_restore import (
     RestoreManager,
     ZFS,
     ProcessPipeline,
+    ValidationError,
 )
 
-from zfs_simple_backup_restore import ValidationError
+# Project checkout (tests/suites/ -> repo root); main() runs the suite from here
+_PROJECT_DIR = Path(__file__).resolve().parents[2]
+
+# Resolved once for the whole run; the sanity check below is meaningless without ZFS userland.
+_HAS_ZFS = shutil.which("zfs") is not None
+
+# Memoized PATH lookup used as the fall-through in patched shutil.which fakes, so names
+# the fake doesn't intercept don't trigger a fresh PATH walk on every call.
+_which_cached = functools.lru_cache(maxsize=None)(shutil.which)
+
+
+def _hide(*names):
+    """shutil.which fake that reports `names` as missing and resolves everything else."""
+    hidden = frozenset(names)
+    return lambda name: None if name in hidden else _which_cached(name)
+
+
+def _redirect(mapping):
+    """shutil.which fake that answers from `mapping` (None = missing), falling back to PATH."""
+    return lambda name: mapping[name] if name in mapping else _which_cached(name)
+
+
+# Shared fakes for patching subprocess.run / ZFS.run, built once instead of per test.
+def _ok(*a, **kw):
+    return None
+
+
+def _verified(*a, **kw):
+    return True
+
+
+def _not_verified(*a, **kw):
+    return False
+
+
+_CPE_ZFS = subprocess.CalledProcessError(1, "zfs")
+
+
+def _fail(*a, **kw):
+    # Reuse one instance; drop the traceback from the previous raise so it doesn't keep growing
+    raise _CPE_ZFS.with_traceback(None)
+
+
+class _NullPipe:
+    """Empty pipe end that stays usable after close(); one shared instance stands in for b""."""
+
+    __slots__ = ()
+
+    def read(self, *args) -> bytes:
+        return b""
+
+    def write(self, data) -> int:
+        return len(data)
+
+    def close(self) -> None:
+        pass
+
+
+_EMPTY_PIPE = _NullPipe()
+
+
+class _FakeProc:
+    """subprocess.Popen stand-in: fixed returncode, in-memory pipes and a canned communicate().
+
+    Empty stdout/stderr and stdin share _EMPTY_PIPE; only data-carrying pipes allocate a BytesIO.
+    """
+
+    __slots__ = ("returncode", "stdin", "stdout", "stderr", "_comm")
+
+    def __init__(self, returncode: int = 0, out: bytes = b"", err: bytes = b""):
+        self.returncode = returncode
+        self.stdin = _EMPTY_PIPE
+        self.stdout = io.BytesIO(out) if out else _EMPTY_PIPE
+        self.stderr = io.BytesIO(err) if err else _EMPTY_PIPE
+        self._comm = (out, err)
+
+    def communicate(self, timeout=None):
+        return self._comm
+
+    def wait(self, timeout=None):
+        return self.returncode
+
+    def poll(self):
+        return self.returncode
+
+    def terminate(self):
+        pass
+
+    def kill(self):
+        pass
+
+
+class _FailingBackupManager:
+    """BackupManager stand-in whose backup() raises FatalError."""
+
+    def __init__(self, args, logger):
+        pass
+
+    def backup(self):
+        raise FatalError("simulated")
+
+
+class _NoopLock:
+    """LockFile stand-in: a context manager that does nothing."""
+
+    def __init__(self, *a, **kw):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _FakeJournal:
+    """systemd.journal stand-in that records the last message sent."""
+
+    LOG_INFO = 6
+    LOG_ERR = 3
+    last = None
+
+    @staticmethod
+    def send(msg, **kw):
+        _FakeJournal.last = (msg, kw)
+
+
+_FAKE_SYSTEMD = types.ModuleType("systemd")
+_FAKE_SYSTEMD.journal = _FakeJournal
+
+
+def _mkdirs(*paths) -> None:
+    """Create each directory and any missing parents, tolerating ones that already exist."""
+    for p in paths:
+        os.makedirs(p, exist_ok=True)
+
+
+def _cmd_str(cmd) -> str:
+    """Stringify a command (list or scalar) once so fakes can match tokens with a substring test."""
+    return " ".join(map(str, cmd)) if isinstance(cmd, (list, tuple)) else str(cmd)
+
+
+def _fake_popen(rules: dict[str, tuple], default: tuple = (0, b"", b"")):
+    """Popen fake answering from {token: (returncode, out, err)}.
+
+    A token equal to the binary's basename or to its subcommand (e.g. "send" in `zfs send ...`)
+    is found with a dict lookup; otherwise the first token contained anywhere in the command wins.
+    """
+    table = tuple(rules.items())
+
+    def fake(cmd, *args, **kwargs):
+        if isinstance(cmd, (list, tuple)) and cmd:
+            spec = rules.get(os.path.basename(str(cmd[0])))
+            if spec is None and len(cmd) > 1:
+                spec = rules.get(str(cmd[1]))
+            if spec is not None:
+                return _FakeProc(*spec)
+        cmd_s = _cmd_str(cmd)
+        for token, spec in table:
+            if token in cmd_s:
+                return _FakeProc(*spec)
+        return _FakeProc(*default)
+
+    return fake
+
+
+# verify_backup_file pipeline (gunzip | head | zstreamdump) where every stage succeeds
+_VERIFY_OK_RULES = {
+    "pigz": (0, b"data", b""),
+    "gzip": (0, b"data", b""),
+    "head": (0, b"data", b""),
+    "zstreamdump": (0, b"ok", b""),
+}
+
+
+def _popen_sequence(*procs):
+    """Popen fake handing out procs in call order, for pipelines matched by position."""
+    it = iter(procs)
+    return lambda *args, **kwargs: next(it)
 
 
 def main():
     """Run unit tests"""
 
-    # Change to the project directory
-    project_dir = Path(__file__).parent.parent.parent
-    sys.path.insert(0, str(project_dir))
-
     # Create tester using the local harness implementation
     tester = TestSuite()
 
@@ -53,13 +240,15 @@ def main():
     ctx = None
     success = False
     try:
-        with tester.temp_chdir(project_dir):
-            # Prepare destructive environment so destructive tests can use tester.ctx
+        with tester.temp_chdir(_PROJECT_DIR):
+            # Prepare destructive environment so destructive tests can use tester.ctx; without
+            # ZFS_DESTRUCTIVE_TESTS=1 nothing is created and the destructive tests are skipped.
             # This will enforce root requirement via TestBase.ensure_root_or_exit()
-            ctx = tester.destructive_env_setup()
-            tester.ctx = ctx
+            if tester.destructive_enabled():
+                ctx = tester.destructive_env_setup()
+                tester.ctx = ctx
 
-            success = tester.run_all(tester.logger)
+            success = tester.run_all()
     finally:
         # Ensure destructive teardown and any temporary dirs are cleaned up
         try:
@@ -83,13 +272,101 @@ class TestSuite(TestBase):
     def __init__(self):
         super().__init__()
         self.ctx: dict = {}
+        # Keep the shared logger off the terminal, the log dir and the journal; tests that
+        # care about Logger output build their own instance or swap the sink back in.
+        if self.logger.log_file:
+            self.logger.log_file.close()
+        self.logger.log_file = io.StringIO()
+        self.logger.stream = io.StringIO()
+        self.logger.journal_available = False
+        # One log file for the whole run; logger tests truncate it instead of creating their own.
+        self._log_fd, self._log_path = tempfile.mkstemp(suffix=".log", dir=self._root)
+        self._file_logger: Logger | None = None
+        # Main holds no state beyond the last parse, so the parse_args tests share one
+        self._main = Main()
+        # Shared ChainManager over an empty dir for tests that never touch the filesystem
+        self._chain = ChainManager(self.scratch("chain-shared-"), "TEST", self.logger)
+        # Canonical backup Args; manager tests derive theirs with manager_args()
+        self._args = Args(action="backup", dataset="rpool/test", mount_point="", prefix="TEST")
+
+    def cleanup(self) -> None:
+        if self._file_logger:
+            self._file_logger.log_file.close()
+        os.close(self._log_fd)
+        super().cleanup()
+
+    def logger_for_file(self) -> Logger:
+        """Return a quiet Logger writing to the shared run log, emptied for the caller.
+
+        The Logger and its handle on the log file are built on first use and reused.
+        """
+        if self._file_logger is None:
+            logger = Logger(verbose=False)
+            if logger.log_file:
+                logger.log_file.close()
+            logger.stream = io.StringIO()
+            logger.journal_available = False
+            logger.log_file_path = self._log_path
+            logger.log_file = os.fdopen(os.dup(self._log_fd), "a")
+            self._file_logger = logger
+        self._file_logger.log_file.flush()
+        os.ftruncate(self._log_fd, 0)
+        return self._file_logger
+
+    def manager_args(self, mount_point: Path, **overrides) -> Args:
+        """Return the canonical Args rooted at mount_point, with overrides applied."""
+        return replace(self._args, mount_point=str(mount_point), **overrides)
+
+    def make_backup_manager(self, mount_point: Path, chain: str | None = None, **overrides) -> BackupManager:
+        """Build a BackupManager over mount_point; with chain, create that chain dir and record it as last."""
+        manager = BackupManager(self.manager_args(mount_point, **overrides), self.logger)
+        if chain:
+            _mkdirs(manager.target_dir / chain)
+            self.write_file(manager.last_chain_file, chain)
+        return manager
+
+    @contextmanager
+    def mock_backup_env(
+        self,
+        stream: bytes | None = b"data",
+        pipeline_error: BaseException | None = None,
+        zfs_run=_ok,
+        verify=_verified,
+        snapshot_exists: bool | None = None,
+    ):
+        """Patch the send pipeline, ZFS.run and ZFS.verify_backup_file in one patch_many.
+
+        The pipeline writes `stream` to the tmpfile (None leaves it uncreated), then raises
+        `pipeline_error` if given. `snapshot_exists` also fixes ZFS.is_snapshot_exists.
+        """
+
+        def run_with_rate_limit(pipeline, source_cmd, tmpfile, rate=None, compression_cmd=None):
+            if stream is not None:
+                self.write_file(Path(tmpfile), stream)
+            if pipeline_error is not None:
+                raise pipeline_error
+
+        fakes = {
+            (ProcessPipeline, "run_with_rate_limit"): run_with_rate_limit,
+            (ZFS, "run"): zfs_run,
+            (ZFS, "verify_backup_file"): verify,
+        }
+        if snapshot_exists is not None:
+            fakes[(ZFS, "is_snapshot_exists")] = lambda *a, **kw: snapshot_exists
+        with self.patch_many(fakes):
+            yield
+
+    def on_patch(self) -> None:
+        # Cmd memoizes binary lookups and the pigz probe; drop them around every patch so
+        # fakes of shutil.which/subprocess.run/etc. are actually consulted and never leak out.
+        Cmd.clear_cache()
 
     def test_required_binaries(self):
+        if not _HAS_ZFS:
+            raise unittest.SkipTest("zfs not installed")
         Cmd.has_required_binaries(self.logger)
 
     def test_cmd_has_required_binaries_missing(self):
-        import shutil
-
         # Simulate zfs and gzip missing
         # Simulate zfs and gzip missing
         with self.patched(shutil, "which", lambda name: None):
@@ -97,14 +374,11 @@ class TestSuite(TestBase):
             assert not ok, "Expected has_required_binaries to return False when binaries are missing"
 
         # Simulate pv required but missing when rate provided
-        orig_which = shutil.which
-        with self.patched(shutil, "which", lambda name, _orig=orig_which: None if name == "pv" else _orig(name)):
+        with self.patched(shutil, "which", _hide("pv")):
             ok2 = Cmd.has_required_binaries(self.logger, rate="10M")
             assert not ok2, "Expected has_required_binaries to return False when pv is missing and rate supplied"
 
     def test_cmd__which_checks_sbin(self):
-        import shutil, os
-
         # Simulate shutil.which not finding the binary, but it exists in /usr/sbin
         with self.patched(shutil, "which", lambda name: None):
 
@@ -119,103 +393,82 @@ class TestSuite(TestBase):
                     p = Cmd._which("zstreamdump")
                     assert p == "/usr/sbin/zstreamdump", f"Expected /usr/sbin/zstreamdump, got {p}"
 
-    def test_cmd_head_helper(self):
-        head_cmd = Cmd.head("-c", "1024")
-        assert isinstance(head_cmd, list)
-        assert head_cmd[0].endswith("head"), f"Expected head command, got {head_cmd[0]}"
-        assert "-c" in head_cmd and "1024" in head_cmd
+    def test_cmd_which_is_cached(self):
+        calls = []
 
-    def test_cmd_zfs_binary_detection(self):
-        import shutil
+        def fake_which(name):
+            calls.append(name)
+            return f"/opt/bin/{name}"
 
+        with self.patched(shutil, "which", fake_which):
+            assert Cmd.zfs("list")[0] == "/opt/bin/zfs"
+            assert Cmd.zfs("get")[0] == "/opt/bin/zfs"
+            assert calls == ["zfs"], f"Expected one PATH lookup, got {calls}"
+
+    def test_cmd_gzip_probes_pigz_once(self):
+        calls = []
+
+        def fake_run(cmd, **kw):
+            calls.append(cmd)
+
+        with self.patch_many({(shutil, "which"): _redirect({"pigz": "/usr/bin/pigz"}), (subprocess, "run"): fake_run}):
+            assert Cmd.gzip()[0] == "/usr/bin/pigz"
+            assert Cmd.gunzip()[0] == "/usr/bin/pigz"
+            assert calls == [["/usr/bin/pigz", "--version"]], f"Expected a single pigz probe, got {calls}"
+
+    def test_cmd_gzip_runner_injection(self):
+        def strict_runner(cmd, **kw):
+            if cmd[0].endswith("pigz") and "--version" in cmd:
+                return subprocess.CompletedProcess(cmd, 0)
+            raise AssertionError(f"unexpected subprocess: {cmd}")
+
+        with self.patched(shutil, "which", _redirect({"pigz": "/usr/bin/pigz"})):
+            assert Cmd.gzip("-9", runner=strict_runner) == ["/usr/bin/pigz", "-9"]
+
+    def test_cmd_factory_shapes(self):
+        cases = [
+            # (factory, args, accepted binary names, expected arguments after the binary)
+            (Cmd.head, ("-c", "1024"), ("head",), ["-c", "1024"]),
+            (Cmd.zfs, ("list", "pool"), ("zfs",), ["list", "pool"]),
+            (Cmd.zpool, ("status", "pool"), ("zpool",), ["status", "pool"]),
+            (Cmd.gunzip, ("file.gz",), ("pigz", "gzip"), ["-dc", "file.gz"]),
+            (Cmd.pv, ("10M",), ("pv",), ["-q", "-L", "10M"]),
+        ]
+        for factory, args, binaries, rest in cases:
+            cmd = factory(*args)
+            assert isinstance(cmd, list), f"{factory.__name__}: expected a list, got {cmd!r}"
+            assert cmd[0].endswith(binaries), f"{factory.__name__}: expected one of {binaries}, got {cmd[0]}"
+            assert cmd[1:] == rest, f"{factory.__name__}: expected {rest}, got {cmd[1:]}"
+        # pv with no rate returns empty
+        assert Cmd.pv(None) == []
+
+    def test_cmd_zfs_binary_detection(self):
         # Simulate zfs not found in PATH
         # Simulate zfs not found in PATH
-        orig_which = shutil.which
-        with self.patched(shutil, "which", lambda name, _orig=orig_which: None if name == "zfs" else _orig(name)):
+        with self.patched(shutil, "which", _hide("zfs")):
             zfs_cmd = Cmd.zfs("list")
             assert zfs_cmd[0].endswith("zfs"), f"Expected fallback to 'zfs', got {zfs_cmd[0]}"
         # Simulate zfs found in PATH
-        orig_which = shutil.which
-        with self.patched(shutil, "which", lambda name, _orig=orig_which: ("somepath/zfs" if name == "zfs" else _orig(name))):
+        with self.patched(shutil, "which", _redirect({"zfs": "somepath/zfs"})):
             zfs_cmd = Cmd.zfs("list")
             assert zfs_cmd[0].endswith("zfs"), f"Expected a zfs binary, got {zfs_cmd[0]}"
 
-    def test_cmd_gzip_binary_detection(self):
-        import shutil
-        import subprocess
-
-        # Simulate pigz not found, gzip found
-        # Simulate pigz not found, gzip found
-        orig_which = shutil.which
-        with self.patched(shutil, "which", lambda name, _orig=orig_which: (None if name == "pigz" else ("somepath/gzip" if name == "gzip" else _orig(name)))):
-            gzip_cmd = Cmd.gzip("-9")
-            assert gzip_cmd[0].endswith("gzip"), f"Expected a gzip binary, got {gzip_cmd[0]}"
-
-        # Simulate pigz found and works
-        def fake_run(cmd, **kwargs):
-            if cmd[0].endswith("pigz") and "--version" in cmd:
-
-                class Result:
-                    pass
-
-                return Result()
-            return subprocess.run(cmd, **kwargs)
-
-        orig_which = shutil.which
-        with self.patched(
-            shutil, "which", lambda name, _orig=orig_which: ("somepath/pigz" if name == "pigz" else ("somepath/gzip" if name == "gzip" else _orig(name)))
-        ):
-            with self.patched(subprocess, "run", fake_run):
-                gzip_cmd = Cmd.gzip("-9")
-                assert gzip_cmd[0].endswith("pigz"), f"Expected a pigz binary, got {gzip_cmd[0]}"
-
-    def test_cmd_gzip_prefers(self):
-        import subprocess
-
-        # Test 1: pigz found and works, should prefer pigz
-        # Test 1: pigz found and works, should prefer pigz
-        def fake_run_pigz_works(cmd, **kwargs):
-            if cmd[0].endswith("pigz") and "--version" in cmd:
-
-                class Result:
-                    pass
-
-                return Result()
-            return subprocess.run(cmd, **kwargs)
-
-        orig_which = shutil.which
-        with self.patched(shutil, "which", lambda name: ("somepath/pigz" if name == "pigz" else ("somepath/gzip" if name == "gzip" else orig_which(name)))):
-            with self.patched(subprocess, "run", fake_run_pigz_works):
-                pigz_cmd = Cmd.gzip()
-                assert pigz_cmd[0].endswith("pigz"), f"Expected pigz binary, got {pigz_cmd[0]}"
-
-        # Test 2: pigz not found, should fall back to gzip
-        orig_which = shutil.which
-        with self.patched(shutil, "which", lambda name, _orig=orig_which: ("somepath/gzip" if name == "gzip" else (None if name == "pigz" else _orig(name)))):
-            gzip_cmd = Cmd.gzip()
-            assert gzip_cmd[0].endswith("gzip"), f"Expected gzip binary, got {gzip_cmd[0]}"
-
-    def test_cmd_zfs_zpool(self):
-        zfs_cmd = Cmd.zfs("list", "pool")
-        zpool_cmd = Cmd.zpool("status", "pool")
-        assert zfs_cmd[0].endswith("zfs"), f"Expected zfs command, got {zfs_cmd[0]}"
-        assert zfs_cmd[1] == "list"
-        assert zpool_cmd[0].endswith("zpool"), f"Expected zpool command, got {zpool_cmd[0]}"
-
-    def test_cmd_gunzip(self):
-        gunzip_cmd = Cmd.gunzip("file.gz")
-        # Accept both binary name and full path, but only check suffix
-        assert gunzip_cmd[0].endswith("pigz") or gunzip_cmd[0].endswith("gzip"), f"Expected pigz or gzip, got {gunzip_cmd[0]}"
-        assert "-dc" in gunzip_cmd
-
-    def test_cmd_pv(self):
-        pv_cmd = Cmd.pv("10M")
-        assert pv_cmd[0].endswith("pv"), f"Expected pv command, got {pv_cmd[0]}"
-        assert "-L" in pv_cmd and "10M" in pv_cmd
+    def test_cmd_gzip_selection(self):
+        pigz_and_gzip = {"pigz": "somepath/pigz", "gzip": "somepath/gzip"}
+        cases = [
+            # (case, which results, pigz probe runner, expected binary)
+            ("pigz_ok", pigz_and_gzip, _ok, "pigz"),
+            ("pigz_fails", pigz_and_gzip, _fail, "gzip"),
+            ("pigz_absent", {"pigz": None, "gzip": "somepath/gzip"}, _ok, "gzip"),
+        ]
+        for case, which, runner, expected in cases:
+            with self.patched(shutil, "which", _redirect(which)):
+                gzip_cmd = Cmd.gzip("-9", runner=runner)
+            assert gzip_cmd[0].endswith(expected), f"{case}: expected {expected}, got {gzip_cmd[0]}"
+            assert gzip_cmd[1:] == ["-9"], f"{case}: unexpected args {gzip_cmd[1:]}"
 
     def test_chainmanager_today_returns_expected_chain_name(self):
-        tmp, c = self.make_chain_manager(prefix="chain-today-")
-        s = c.today()
+        s = self._chain.today()
         assert s.startswith("chain-") and len(s) == 14
 
     def test_chainmanager_is_within_backup_dir_detects_inside_and_outside(self):
@@ -230,23 +483,33 @@ class TestSuite(TestBase):
         tmp, c = self.make_chain_manager(prefix="chain-nonempty-")
         d = tmp / "chain-test-nonempty"
         self.create_chain_dirs(tmp, ["chain-test-nonempty"])
-        self.write_file(d / "ok.zfs.gz", b"data")
-        self.write_file(d / "empty.zfs.gz", b"")
-        files = c.files(d)
-        assert any(f.name == "ok.zfs.gz" for f in files)
-        assert all(f.stat().st_size > 0 for f in files)
+        self.write_files(d, {"ok.zfs.gz": b"data", "empty.zfs.gz": b""})
+        names = [f.name for f in c.files(d)]
+        with os.scandir(d) as it:
+            sizes = {e.name: e.stat().st_size for e in it}
+        assert "ok.zfs.gz" in names
+        assert all(sizes[n] > 0 for n in names)
 
     def test_chainmanager_files_returned_in_sorted_order(self):
         tmp, c = self.make_chain_manager(prefix="chain-sorted-")
         d = tmp / "chain-test-sorted"
         self.create_chain_dirs(tmp, ["chain-test-sorted"])
-        self.write_file(d / "b.zfs.gz", b"data")
-        self.write_file(d / "a.zfs.gz", b"data")
-        self.write_file(d / "c.zfs.gz", b"data")
+        self.write_files(d, {"b.zfs.gz": b"data", "a.zfs.gz": b"data", "c.zfs.gz": b"data"})
         files = c.files(d)
         names = [f.name for f in files]
         assert names == sorted(names)
 
+    def test_chainmanager_files_missing_dir_is_empty(self):
+        assert self._chain.files(self._chain.target_dir / "chain-missing") == []
+
+    def test_chainmanager_ignores_non_chain_names(self):
+        tmp, c = self.make_chain_manager(prefix="chain-names-")
+        self.create_chain_dirs(tmp, ["chain-20240101", "chain-20240102", "chain-notes", "chain-2024"])
+        assert c.latest_chain_dir().name == "chain-20240102"
+        c.prune_old(1, dry_run=False)
+        remaining = sorted(os.listdir(tmp))
+        assert remaining == ["chain-2024", "chain-20240102", "chain-notes"], remaining
+
     def test_chainmanager_prune_old_removes_old_chains(self):
         tmp, c = self.make_chain_manager(prefix="chain-prune-")
         # Create 4 chain directories
@@ -254,22 +517,22 @@ class TestSuite(TestBase):
         self.create_chain_dirs(tmp, names)
 
         c.prune_old(2, dry_run=False)
-        chains = set(p.name for p in tmp.iterdir() if p.is_dir() and p.name.startswith("chain-"))
+        # DirEntry.is_dir() answers from the dirent type, no stat per entry
+        with os.scandir(tmp) as it:
+            chains = {e.name for e in it if e.is_dir(follow_symlinks=False) and e.name.startswith("chain-")}
         assert len(chains) == 2
 
     def test_chainmanager_chain_dir_raises(self):
-        tmp, c = self.make_chain_manager(prefix="chain-raises-")
-        try:
-            c.chain_dir("not-a-chain")
-            assert False, "Should have raised FatalError"
-        except FatalError:
-            pass
+        with self.assert_raises(FatalError, "Should have raised FatalError"):
+            self._chain.chain_dir("not-a-chain")
 
-    def test_chainmanager_chain_dir_latest(self):
+    def test_chainmanager_latest_chain_dir(self):
+        # chain_dir() without a name falls back to latest_chain_dir(); check both on one tree
         tmp, c = self.make_chain_manager(prefix="chain-latest-")
-        self.create_chain_dirs(tmp, ["chain-20200101", "chain-20200102"])
-        latest = c.chain_dir()
-        assert latest.name == "chain-20200102"
+        self.create_chain_dirs(tmp, ["chain-20200101", "chain-20200102", "chain-20200103"])
+        for method in (c.chain_dir, c.latest_chain_dir):
+            latest = method()
+            assert latest.name == "chain-20200103", f"{method.__name__}: got {latest.name}"
 
     def test_lockfile_context(self):
         with self.tempdir(prefix="lockfile-") as tmp_root:
@@ -278,61 +541,75 @@ class TestSuite(TestBase):
                 self.assert_file_exists(lock_path)
             self.assert_file_not_exists(lock_path)
 
-        # Test lockfile failure
-        import fcntl
+        # Test lockfile failure entirely in memory: no directory, file or descriptor is touched
 
-        with self.tempdir(prefix="lockfile-fail-") as tmp_root:
-            lock_path = tmp_root / "test.lock"
+        fake_fd = 10_000
+        closed = []
 
-            def failing_flock(*args, **kw):
-                raise IOError("Lock failed")
+        def failing_flock(*args, **kw):
+            raise IOError("Lock failed")
 
-            with self.patched(fcntl, "flock", failing_flock):
-                try:
-                    with LockFile(lock_path, self.logger):
-                        assert False, "Should have raised FatalError"
-                except FatalError:
-                    pass
+        fakes = {
+            (os, "makedirs"): lambda *a, **kw: None,
+            (os, "open"): lambda *a, **kw: fake_fd,
+            (os, "close"): closed.append,
+            (fcntl, "flock"): failing_flock,
+        }
+        with self.patch_many(fakes):
+            with self.assert_raises(FatalError):
+                with LockFile(Path("/nonexistent/test.lock"), self.logger):
+                    assert False, "Should have raised FatalError"
+        assert closed == [fake_fd], f"Lock fd should be closed when flock fails, got {closed}"
 
     def test_logger_output(self):
-        self.logger.info("Logger info test")
-        self.logger.always("Logger always test")
-        self.logger.error("Logger error test")
-
-    def test_zfs_is_dataset_exists_true(self):
-        import subprocess
-
-        with self.patched(subprocess, "run", lambda *a, **kw: None):
-            assert ZFS.is_dataset_exists("rpool/test")
+        # Exercise the console write path against /dev/null; the log file sink is the shared StringIO
+        with open(os.devnull, "w") as devnull, self.patched(self.logger, "stream", devnull):
+            self.logger.info("Logger info test")
+            self.logger.always("Logger always test")
+            self.logger.error("Logger error test")
+        logged = self.logger.log_file.getvalue()
+        for line in ("[INFO] Logger info test", "[INFO] Logger always test", "[ERROR] Logger error test"):
+            assert line in logged, f"Expected {line!r} in the log file"
+
+    def test_zfs_exists_matrix(self):
+        cases = [
+            (ZFS.is_dataset_exists, ("rpool/test",)),
+            (ZFS.is_pool_exists, ("rpool",)),
+            (ZFS.is_snapshot_exists, ("rpool/test", "snap1")),
+        ]
+        for fn, args in cases:
+            assert fn(*args, runner=_ok), f"{fn.__name__}{args} should be True when the command succeeds"
+            assert not fn(*args, runner=_fail), f"{fn.__name__}{args} should be False when the command fails"
 
-    def test_zfs_is_dataset_exists_false(self):
-        import subprocess
+    def test_zfs_get_props_single_call(self):
+        calls = []
 
-        def fail(*a, **kw):
-            raise subprocess.CalledProcessError(1, "zfs")
+        def fake_run(cmd, **kw):
+            calls.append(cmd)
+            return subprocess.CompletedProcess(cmd, 0, stdout="mountpoint\t/restored/data\nmounted\tno\n")
 
-        with self.patched(subprocess, "run", fail):
-            assert not ZFS.is_dataset_exists("rpool/test")
+        props = ZFS.get_props("restored/data", ["mountpoint", "mounted"], runner=fake_run)
+        assert props == {"mountpoint": "/restored/data", "mounted": "no"}, props
+        assert len(calls) == 1 and calls[0][-2:] == ["mountpoint,mounted", "restored/data"], calls
 
     def test_zfs_run_does_not_execute_when_dry_run(self):
-        import subprocess
-
         called = []
-        with self.patched(subprocess, "run", lambda *a, **kw: called.append(a)):
-            ZFS.run(["zfs", "list"], self.logger, dry_run=True)
-            assert not called  # Should not call subprocess.run when dry_run=True
+        ZFS.run(["zfs", "list"], self.logger, dry_run=True, runner=lambda *a, **kw: called.append(a))
+        assert not called  # Should not call subprocess.run when dry_run=True
 
     def test_zfs_run_invokes_subprocess_run_when_not_dry(self):
-        import subprocess
-
         called = {}
 
         def fake_run(cmd, check, **kwargs):
             called["cmd"] = cmd
+            called["close_fds"] = kwargs.get("close_fds")
 
-        with self.patched(subprocess, "run", fake_run):
-            ZFS.run(["zfs", "list"], self.logger, dry_run=False)
-            assert called["cmd"] == ["zfs", "list"]
+        ZFS.run(["zfs", "list"], self.logger, dry_run=False, runner=fake_run)
+        assert called["cmd"] == ["zfs", "list"]
+        assert called["close_fds"] is False
+        # An explicit close_fds overrides the default instead of clashing with it
+        ZFS.run(["zfs", "list"], self.logger, dry_run=False, runner=fake_run, close_fds=True)
+        assert called["close_fds"] is True
 
     def test_config_values(self):
         assert CONFIG.DEFAULT_INTERVAL_DAYS > 0
@@ -348,7 +625,6 @@ class TestSuite(TestBase):
         assert kd in df
 
         # Test with env vars set
-        import os
 
         with self.patched(os, "environ", {"ZFS_BACKUP_LOG_DIR": "/custom/log", "ZFS_BACKUP_LOCK_DIR": "/custom/lock"}):
             assert CONFIG.get_log_dir() == "/custom/log"
@@ -356,56 +632,20 @@ class TestSuite(TestBase):
             df_custom = CONFIG.get_default_lockfile()
             assert "/custom/lock" in df_custom
 
-    def test_cmd_pv_and_gzip_behavior(self):
-        import shutil
-        import subprocess
-
-        # pv with no rate returns empty
-        assert Cmd.pv(None) == []
-        pv_cmd = Cmd.pv("10M")
-        assert pv_cmd and (pv_cmd[0].endswith("pv") or pv_cmd[0].endswith("pv"))
-        assert "-L" in pv_cmd and "10M" in pv_cmd
-
-        # Simulate pigz available and working
-        orig_which = shutil.which
-
-        def fake_which(name):
-            if name == "pigz":
-                return "/usr/bin/pigz"
-            if name == "gzip":
-                return "/usr/bin/gzip"
-            return orig_which(name)
-
-        def fake_run(cmd, **kw):
-            # pigz --version should succeed
-            if cmd and cmd[0].endswith("pigz") and "--version" in cmd:
-
-                class R:
-                    pass
-
-                return R()
-            return subprocess.run(cmd, **kw)
-
-        with self.patched(shutil, "which", fake_which):
-            with self.patched(subprocess, "run", fake_run):
-                gz = Cmd.gzip()
-                assert gz[0].endswith("pigz")
-
-        # Simulate pigz present but failing; should fallback to gzip
-        with self.patched(shutil, "which", lambda name: "/usr/bin/pigz" if name == "pigz" else "/usr/bin/gzip"):
-            with self.patched(subprocess, "run", lambda *a, **kw: (_ for _ in ()).throw(Exception("fail"))):
-                gz2 = Cmd.gzip()
-                assert gz2[0].endswith("gzip")
-
     def test_chainmanager_files_sorting_and_prune_tmp(self):
         tmp, c = self.make_chain_manager(prefix="ctest-")
         chain = tmp / "chain-20250101"
         self.create_chain_dirs(tmp, ["chain-20250101"])
 
         # Create full/diff files with specific timestamps embedded in names
-        self.write_file(chain / "CT-full-20250101000001.zfs.gz", b"a")
-        self.write_file(chain / "CT-diff-20250101000002.zfs.gz", b"a")
-        self.write_file(chain / "CT-full-20250101000000.zfs.gz", b"a")
+        self.write_files(
+            chain,
+            {
+                "CT-full-20250101000001.zfs.gz": b"a",
+                "CT-diff-20250101000002.zfs.gz": b"a",
+                "CT-full-20250101000000.zfs.gz": b"a",
+            },
+        )
         files = c.files(chain)
         names = [f.name for f in files]
         assert names[0].endswith("-full-20250101000000.zfs.gz")
@@ -413,13 +653,11 @@ class TestSuite(TestBase):
         assert names[2].endswith("-diff-20250101000002.zfs.gz")
 
         # Create old temp files and ensure prune_old removes them
-        self.write_file(chain / "old.tmp", b"tmp")
-        self.write_file(tmp / "old-temp.tmp", b"tmp")
-        import time, os
-
-        old_time = time.time() - 7200
-        os.utime(chain / "old.tmp", (old_time, old_time))
-        os.utime(tmp / "old-temp.tmp", (old_time, old_time))
+        self.write_files(
+            tmp,
+            {"chain-20250101/old.tmp": b"tmp", "old-temp.tmp": b"tmp"},
+            ages={"chain-20250101/old.tmp": 7200, "old-temp.tmp": 7200},
+        )
 
         c.prune_old(10, dry_run=False)
         self.assert_file_not_exists(chain / "old.tmp")
@@ -428,20 +666,19 @@ class TestSuite(TestBase):
     def test_base_manager_validate_and_sanitize(self):
         with self.tempdir(prefix="bm-") as td:
             # Empty dataset should raise
-            args = Args(action="backup", dataset="", mount_point=str(td))
-            try:
+            args = self.manager_args(td, dataset="")
+            with self.assert_raises(ValidationError):
                 BaseManager(args, self.logger)
-                assert False
-            except ValidationError:
-                pass
 
             # Path traversal in dataset
-            args2 = Args(action="backup", dataset="../etc", mount_point=str(td))
-            try:
+            args2 = self.manager_args(td, dataset="../etc")
+            with self.assert_raises(ValidationError):
                 BaseManager(args2, self.logger)
-                assert False
-            except ValidationError:
-                pass
+
+            # Characters outside alphanumerics and "/_-" are rejected
+            for bad in ("rpool/te st", "rpool/test;rm", "rpool@snap"):
+                with self.assert_raises(ValidationError, f"{bad!r} should be rejected"):
+                    BaseManager(self.manager_args(td, dataset=bad), self.logger)
 
             # Non-absolute mount point: BaseManager accepts it; ensure sanitized dataset name is used
             args3 = Args(action="backup", dataset="rpool/test", mount_point="relative/path")
@@ -453,16 +690,20 @@ class TestSuite(TestBase):
             m = BaseManager(args4, self.logger)
             assert "rpool_my-data" in str(m.target_dir)
 
-    def test_lockfile_context_ops(self):
+    def test_lockfile_rejects_second_holder(self):
+        # The plain enter/exit roundtrip is covered by test_lockfile_context; here a second
+        # LockFile on the same path must fail with a real (unpatched) flock while the first holds it
         with self.tempdir(prefix="locktest-") as td:
             p = Path(td) / "test.lock"
             with LockFile(p, self.logger):
+                second = LockFile(p, self.logger)
+                with self.assert_raises(FatalError, "Second LockFile should not acquire a held lock"):
+                    second.__enter__()
+                assert second.fd is None
                 self.assert_file_exists(p)
             self.assert_file_not_exists(p)
 
     def test_zfs_verify_backup_file_missing_and_zstreamdump_missing(self):
-        import subprocess
-
         with self.tempdir(prefix="zfs-") as td:
             f = Path(td) / "nope.zfs.gz"
             assert not f.exists()
@@ -478,60 +719,21 @@ class TestSuite(TestBase):
             with self.patched(subprocess, "Popen", fake_popen):
                 assert ZFS.verify_backup_file(f2, self.logger) is False
 
-    def test_zfs_is_pool_exists_true(self):
-        import subprocess
-
-        with self.patched(subprocess, "run", lambda *a, **kw: None):
-            assert ZFS.is_pool_exists("rpool")
-
-    def test_zfs_is_pool_exists_false(self):
-        import subprocess
-
-        def fail(*a, **kw):
-            raise subprocess.CalledProcessError(1, "zpool")
-
-        with self.patched(subprocess, "run", fail):
-            assert not ZFS.is_pool_exists("nonexistent")
-
-    def test_zfs_is_snapshot_exists_true(self):
-        import subprocess
-
-        with self.patched(subprocess, "run", lambda *a, **kw: None):
-            assert ZFS.is_snapshot_exists("rpool/test", "snap1")
-
-    def test_zfs_is_snapshot_exists_false(self):
-        import subprocess
-
-        def fail(*a, **kw):
-            raise subprocess.CalledProcessError(1, "zfs")
-
-        with self.patched(subprocess, "run", fail):
-            assert not ZFS.is_snapshot_exists("rpool/test", "nonexistent")
-
-    def test_chainmanager_latest_chain_dir(self):
-        tmp, c = self.make_chain_manager(prefix="chain-latest2-")
-        self.create_chain_dirs(tmp, ["chain-20200101", "chain-20200102", "chain-20200103"])
-        latest = c.latest_chain_dir()
-        assert latest.name == "chain-20200103"
-
     def test_chainmanager_prune_temp_files_removes_old_temp_files(self):
         tmp, c = self.make_chain_manager(prefix="chain-prune-tmp-")
         chain_dir = tmp / "chain-20200101"
-        chain_dir.mkdir(exist_ok=True)
-
-        # Create some temp files that should be cleaned up
-        self.write_file(chain_dir / "backup1.zfs.gz.tmp", b"temp data")
-        self.write_file(chain_dir / "backup2.zfs.gz", b"real data")
-        self.write_file(tmp / "old-temp-file.tmp", b"old temp")
-
-        # Set old timestamp on temp files to simulate old files
-        import time
-
-        old_time = time.time() - 86400  # 1 day ago
-        import os
-
-        os.utime(chain_dir / "backup1.zfs.gz.tmp", (old_time, old_time))
-        os.utime(tmp / "old-temp-file.tmp", (old_time, old_time))
+        chain_dir.mkdir()
+
+        # Create some temp files that should be cleaned up, backdated a day to simulate old files
+        self.write_files(
+            tmp,
+            {
+                "chain-20200101/backup1.zfs.gz.tmp": b"temp data",
+                "chain-20200101/backup2.zfs.gz": b"real data",
+                "old-temp-file.tmp": b"old temp",
+            },
+            ages={"chain-20200101/backup1.zfs.gz.tmp": 86400, "old-temp-file.tmp": 86400},
+        )
 
         c.prune_old(1, dry_run=False)
 
@@ -540,29 +742,34 @@ class TestSuite(TestBase):
         self.assert_file_not_exists(tmp / "old-temp-file.tmp")
         self.assert_file_exists(chain_dir / "backup2.zfs.gz")
 
-    def test_logger_writes_messages_to_log_file(self):
-        import os
-
-        # Use TestBase tempdir to ensure cleanup
-        with self.tempdir(prefix="logger-test-") as td:
-            log_path = td / "test.log"
+    def test_logger_flushes_every_line(self):
+        # info() lines (e.g. "Running: zfs send ...") must reach the file before a long command
+        # starts, so they survive the process being killed mid-run
+        flushes = []
+        sink = io.StringIO()
+        logger = Logger(verbose=False)
+        if logger.log_file:
+            logger.log_file.close()
+        logger.log_file = sink
+        logger.stream = io.StringIO()
+        logger.journal_available = False
+        with self.patched(sink, "flush", lambda: flushes.append(sink.getvalue().count("\n"))):
+            logger.info("running")
+            logger.always("visible")
+            logger.error("visible too")
+        assert flushes == [1, 2, 3], f"Every log line should be flushed, got {flushes}"
 
-            # Create logger that writes to our temp file
-            logger = Logger(verbose=False)
-            logger.log_file_path = str(log_path)
-
-            # Attach log file to logger using harness helper
-            self.set_logger_logfile(logger, log_path)
-
-            logger.info("Test info message")
-            logger.error("Test error message")
-            logger.always("Test always message")
+    def test_logger_writes_messages_to_log_file(self):
+        logger = self.logger_for_file()
+        logger.info("Test info message")
+        logger.error("Test error message")
+        logger.always("Test always message")
 
-            # Check that messages were written to file
-            content = self.read_log(log_path)
-            assert "Test info message" in content
-            assert "Test error message" in content
-            assert "Test always message" in content
+        # Check that messages were written to file
+        content = os.pread(self._log_fd, 65536, 0).decode()
+        assert "Test info message" in content
+        assert "Test error message" in content
+        assert "Test always message" in content
 
     def test_args_dataclass(self):
         # Test Args dataclass creation with defaults
@@ -577,109 +784,72 @@ class TestSuite(TestBase):
         assert args.verbose == False
 
     def test_main_parse_args_parses_backup_and_restore(self):
-        import sys
-
         # Test basic backup args
-        # Test basic backup args
-        with self.patched(sys, "argv", ["script", "--action", "backup", "--dataset", "rpool/test", "--mount", "/mnt/backup"]):
-            main = Main()
-            main.parse_args()
-            assert main.args.action == "backup"
-            assert main.args.dataset == "rpool/test"
-            assert main.args.mount_point == "/mnt/backup"
+        self._main.parse_args(["--action", "backup", "--dataset", "rpool/test", "--mount", "/mnt/backup"])
+        assert self._main.args.action == "backup"
+        assert self._main.args.dataset == "rpool/test"
+        assert self._main.args.mount_point == "/mnt/backup"
 
         # Test restore args
-        with self.patched(sys, "argv", ["script", "--action", "restore", "--dataset", "rpool/test", "--mount", "/mnt/backup", "--restore-pool", "newpool"]):
-            main = Main()
-            main.parse_args()
-            assert main.args.action == "restore"
-            assert main.args.restore_pool == "newpool"
+        self._main.parse_args(["--action", "restore", "--dataset", "rpool/test", "--mount", "/mnt/backup", "--restore-pool", "newpool"])
+        assert self._main.args.action == "restore"
+        assert self._main.args.restore_pool == "newpool"
 
-    def test_main_parse_args_missing_required_args_exits(self):
-        import sys
+    def test_main_parse_args_defaults_to_sys_argv(self):
+        with self.patched(sys, "argv", ["script", "--action", "cleanup", "--dataset", "rpool/test", "--mount", "/mnt/backup"]):
+            self._main.parse_args()
+            assert self._main.args.action == "cleanup"
 
+    def test_main_parse_args_missing_required_args_exits(self):
         # Test missing required args (should exit)
-        # Test missing required args (should exit)
-        with self.patched(sys, "argv", ["script", "--action", "backup"]):
-            main = Main()
-            try:
-                main.parse_args()
-                assert False, "Should have exited due to missing args"
-            except SystemExit as e:
-                assert e.code == CONFIG.EXIT_INVALID_ARGS
+        with self.assert_raises(SystemExit, "Should have exited due to missing args") as ei:
+            self._main.parse_args(["--action", "backup"])
+        assert ei.value.code == CONFIG.EXIT_INVALID_ARGS
 
     def test_main_validate_authorization_and_binary_checks(self):
-        import os
-
         # Mock all validation checks to pass
-        # Mock all validation checks to pass
-        with self.patched(os, "geteuid", lambda: 0):
-            with self.patched(ZFS, "is_dataset_exists", lambda dataset: True):
-                with self.patched(Cmd, "has_required_binaries", lambda logger, rate=None: True):
-                    with self.tempdir(prefix="validate-") as td:
-                        args = Args(action="backup", dataset="rpool/test", mount_point=str(td))
-                        main = Main()
-                        main.args = args
-                        main.logger = self.logger
-
-                        # Should not raise any exceptions
-                        main.validate()
+        mocks = {
+            (os, "geteuid"): lambda: 0,
+            (ZFS, "is_dataset_exists"): lambda dataset: True,
+            (Cmd, "has_required_binaries"): lambda logger, rate=None: True,
+        }
+        with self.patch_many(mocks), self.tempdir(prefix="validate-") as td:
+            args = Args(action="backup", dataset="rpool/test", mount_point=str(td))
+            main = Main()
+            main.args = args
+            main.logger = self.logger
 
-                        # Test validation failure for non-root
-                        with self.patched(os, "geteuid", lambda: 1000):
-                            try:
-                                main.validate()
-                                assert False, "Should have raised ValidationError for non-root"
-                            except ValidationError:
-                                pass
-
-    def test_base_manager_init(self):
-        with self.tempdir(prefix="base-manager-") as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST")
-            manager = BaseManager(args, self.logger)
-
-            assert manager.args == args
-            assert manager.logger == self.logger
-            assert manager.dry_run == args.dry_run
-            assert manager.prefix == "TEST"
-            assert "rpool_test" in str(manager.target_dir)
-
-    def test_backup_manager_init(self):
-        with self.tempdir(prefix="backup-manager-") as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST")
-            manager = BackupManager(args, self.logger)
+            # Should not raise any exceptions
+            main.validate()
 
-            assert manager.args == args
-            assert manager.logger == self.logger
-            assert manager.dry_run == args.dry_run
-            assert manager.prefix == "TEST"
-            assert "rpool_test" in str(manager.target_dir)
+            # Test validation failure for non-root
+            with self.patched(os, "geteuid", lambda: 1000):
+                with self.assert_raises(ValidationError, "Should have raised ValidationError for non-root"):
+                    main.validate()
 
-    def test_restore_manager_init(self):
-        with self.tempdir(prefix="restore-manager-") as td:
-            args = Args(action="restore", dataset="rpool/test", mount_point=str(td), restore_pool="newpool", prefix="TEST")
-            manager = RestoreManager(args, self.logger)
+    def test_manager_init(self):
+        with self.tempdir(prefix="manager-init-") as td:
+            backup_args = self.manager_args(td)
+            restore_args = self.manager_args(td, action="restore", restore_pool="newpool")
+            cases = ((BaseManager, backup_args), (BackupManager, backup_args), (RestoreManager, restore_args))
+            for manager_cls, args in cases:
+                manager = manager_cls(args, self.logger)
 
-            assert manager.args == args
-            assert manager.logger == self.logger
-            assert manager.dry_run == args.dry_run
-            assert manager.prefix == "TEST"
-            assert "rpool_test" in str(manager.target_dir)
+                assert manager.args == args, f"{manager_cls.__name__}: args not stored"
+                assert manager.logger == self.logger
+                assert manager.dry_run == args.dry_run
+                assert manager.prefix == "TEST"
+                assert "rpool_test" in str(manager.target_dir)
 
     def test_backup_mode_decision(self):
         # Test backup mode decision logic (mocked)
         with self.tempdir(prefix="backup-mode-") as tmp_dir:
-            args = Args(
-                action="backup",
-                dataset="rpool/test",
-                mount_point=str(tmp_dir),
-                interval=7,
-                dry_run=True,  # Important: dry run to avoid actual operations
-            )
+            # Important: dry run to avoid actual operations
+            args = self.manager_args(tmp_dir, interval=7, dry_run=True)
             manager = BackupManager(args, self.logger)
 
             # Ensure target directory exists
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(manager.target_dir)
 
             # Test when no last_chain_file exists (should do full backup)
             self.assert_file_not_exists(manager.last_chain_file)
@@ -688,7 +858,7 @@ class TestSuite(TestBase):
             chain_name = "chain-20240101"
             self.write_file(manager.last_chain_file, chain_name)
             chain_dir = manager.target_dir / chain_name
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
 
             # Create a fake full backup file with old timestamp
             full_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
@@ -701,17 +871,15 @@ class TestSuite(TestBase):
 
     def test_backup_manager_backup_dry_run_no_subprocess(self):
         """Ensure BackupManager.backup() in dry-run mode doesn't invoke subprocess and still writes last_chain."""
-        import subprocess
-
         with self.tempdir(prefix="backup-dryrun-") as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=True)
+            args = self.manager_args(td, dry_run=True)
             manager = BackupManager(args, self.logger)
 
             # Ensure no last_chain exists initially
             self.assert_file_not_exists(manager.last_chain_file)
 
             # Patch subprocess.Popen to fail if called (should not be called in dry-run)
-            with self.patched(subprocess, "Popen", lambda *a, **kw: (_ for _ in ()).throw(Exception("Popen should not be called in dry-run"))):
+            with self.patched(subprocess, "Popen", self.raising(AssertionError("Popen should not be called in dry-run"))):
                 manager.backup()
 
             # After backup in dry-run, last_chain_file should exist and contain chain name
@@ -722,175 +890,82 @@ class TestSuite(TestBase):
 
     def test_restore_manager_dry_run_no_subprocess(self):
         """Ensure RestoreManager.restore() in dry-run verifies files but does not spawn subprocesses."""
-        import subprocess
-
         with self.tempdir(prefix="restore-dryrun-") as td:
             # Prepare a fake chain with one backup file
-            mgr_args = Args(action="restore", dataset="rpool/test", mount_point=str(td), restore_pool="restored", restore_chain="chain-20250101", dry_run=True)
+            mgr_args = self.manager_args(td, action="restore", restore_pool="restored", restore_chain="chain-20250101", dry_run=True)
             # Create chain dir and a dummy backup file
             target_dir = Path(mgr_args.mount_point) / mgr_args.dataset.replace("/", "_")
             chain_dir = target_dir / mgr_args.restore_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             backup_file = chain_dir / "TEST-full-20250101000000.zfs.gz"
             self.write_file(backup_file, b"notazfs")
 
             # Patch ZFS.verify_backup_file to return True so restore proceeds to dry-run messages
-            with self.patched(ZFS, "verify_backup_file", lambda p, logger: True):
+            with self.patched(ZFS, "verify_backup_file", _verified):
                 # Patch subprocess.Popen to raise if called (should not be in dry-run)
-                with self.patched(subprocess, "Popen", lambda *a, **kw: (_ for _ in ()).throw(Exception("Popen should not be called in dry-run restore"))):
+                with self.patched(subprocess, "Popen", self.raising(AssertionError("Popen should not be called in dry-run restore"))):
                     mgr = RestoreManager(mgr_args, self.logger)
                     # Should complete without raising
                     mgr.restore()
 
     def test_backup_full_handles_zfs_send_failure(self):
         """Simulate zfs send (p1) failing and ensure BackupManager handles it and raises FatalError."""
-        import subprocess
-        import io
-
         with self.tempdir(prefix="backup-fail-zfs-") as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
-
             # Ensure last_chain_file exists to create chain dir for writing
-            chain_name = manager.chain.today()
-            self.write_file(manager.last_chain_file, chain_name)
-            chain_dir = manager.target_dir / chain_name
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            chain_name = self._chain.today()
+            manager = self.make_backup_manager(td, chain=chain_name)
 
             # Patch ZFS.run to be a no-op (so snapshot creation doesn't error)
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
-
-                class MockProc:
-                    def __init__(self, returncode=0, communicate_ret=(b"", b""), stdout=None):
-                        self.returncode = returncode
-                        self._communicate_ret = communicate_ret
-                        self.stdout = stdout
-
-                    def communicate(self, timeout=None):
-                        return self._communicate_ret
-
-                    def wait(self):
-                        return self.returncode
-
-                def fake_popen(cmd, stdout=None, stderr=None, stdin=None, **kw):
-                    # p1 = zfs send -> simulate failure
-                    if isinstance(cmd, (list, tuple)) and any("send" in str(c) for c in cmd):
-                        return MockProc(returncode=1, communicate_ret=(b"", b"zfs send failed"), stdout=io.BytesIO(b""))
-                    # p2/p3 behave as successful
-                    return MockProc(returncode=0, communicate_ret=(b"", b""), stdout=io.BytesIO(b""))
-
-                with self.patched(subprocess, "Popen", fake_popen):
-                    try:
+            with self.patched(ZFS, "run", _ok):
+                # p1 = zfs send -> simulate failure; p2/p3 behave as successful
+                with self.patched(subprocess, "Popen", _fake_popen({"send": (1, b"", b"zfs send failed")})):
+                    with self.assert_raises(FatalError, "Expected FatalError due to zfs send failure"):
                         manager.backup_full()
-                        assert False, "Expected FatalError due to zfs send failure"
-                    except FatalError:
-                        pass
 
     def test_backup_full_handles_gzip_failure(self):
         """Simulate gzip (p2/p3) failing and ensure BackupManager raises FatalError and cleans up tmpfile."""
-        import subprocess
-        import io
-
         with self.tempdir(prefix="backup-fail-gzip-") as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            manager = self.make_backup_manager(td)
 
-            # Create chain dir
+            # Create chain dir (and the target dir above it)
             chain_name = manager.chain.today()
             chain_dir = manager.target_dir / chain_name
-            chain_dir.mkdir(parents=True, exist_ok=True)
-
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
-
-                class MockProc:
-                    def __init__(self, returncode=0, communicate_ret=(b"", b""), stdout=None):
-                        self.returncode = returncode
-                        self._communicate_ret = communicate_ret
-                        self.stdout = stdout
-
-                    def communicate(self, timeout=None):
-                        return self._communicate_ret
-
-                    def wait(self):
-                        return self.returncode
-
-                def fake_popen(cmd, stdout=None, stderr=None, stdin=None, **kw):
-                    # p1 (zfs send) succeeds
-                    if isinstance(cmd, (list, tuple)) and any("send" in str(c) for c in cmd):
-                        return MockProc(returncode=0, communicate_ret=(b"", b""), stdout=io.BytesIO(b"streamdata"))
-                    # Simulate gzip failure (the last process) by returning non-zero for gzip command
-                    if isinstance(cmd, (list, tuple)) and (str(cmd[0]).endswith("pigz") or str(cmd[0]).endswith("gzip")):
-                        return MockProc(returncode=1, communicate_ret=(b"", b"gzip error"), stdout=io.BytesIO(b""))
-                    # pv or others succeed
-                    return MockProc(returncode=0, communicate_ret=(b"", b""), stdout=io.BytesIO(b""))
-
-                # Use the central patched_pipeline helper to simulate gzip failure.
-                def gzip_side(source_cmd, tmpfile, rate, compression_cmd):
-                    # create tmpfile (pipeline started) then fail to simulate compression error
-                    Path(tmpfile).parent.mkdir(parents=True, exist_ok=True)
-                    Path(tmpfile).write_bytes(b"streamdata")
-                    raise Exception("gzip error")
-
-                with self.patched_pipeline(run_side_effect=gzip_side) as mock_pipeline:
-                    try:
-                        manager.backup_full()
-                        assert False, "Expected FatalError due to gzip failure"
-                    except FatalError:
-                        # Ensure tmpfile was cleaned up (no .tmp files remain)
-                        tmp_files = list(chain_dir.glob("*.tmp"))
-                        assert not tmp_files, f"Temporary files were not cleaned up: {tmp_files}"
-                        pass
+            _mkdirs(chain_dir)
+
+            # Simulate gzip failure: the pipeline starts (tmpfile exists) then the compression fails
+            def gzip_side(pipeline, source_cmd, tmpfile, rate, compression_cmd):
+                self.write_file(Path(tmpfile), b"streamdata")
+                raise Exception("gzip error")
+
+            with self.patch_many({(ZFS, "run"): _ok, (ProcessPipeline, "run_with_rate_limit"): gzip_side}):
+                with self.assert_raises(FatalError, "Expected FatalError due to gzip failure"):
+                    manager.backup_full()
+                # Ensure tmpfile was cleaned up (no .tmp files remain)
+                self.assert_no_tmp_files(chain_dir)
 
     def test_cmd_required_binaries_sets(self):
         # Ensure required_binaries returns expected set and includes pv when rate provided
         base = Cmd.required_binaries()
         assert "zfs" in base and "gzip" in base and "zpool" in base
         with_rate = Cmd.required_binaries(rate="10M")
-        assert "pv" in with_rate
+        assert "pv" in with_rate and "pv" not in base
+        # The sets are constants: repeated calls return the same object
+        assert Cmd.required_binaries(rate="1M") is with_rate
 
     def test_zfs_verify_backup_file_success(self):
         """Simulate zstreamdump returning success and ensure verify_backup_file returns True."""
-        import subprocess
-        import io
-
         with self.tempdir(prefix="zfs-verify-ok-") as td:
             f = Path(td) / "ok.zfs.gz"
             self.write_file(f, b"fakecontent")
 
-            class MockProc:
-                def __init__(self, returncode=0, stdout=None, stderr=None):
-                    self.returncode = returncode
-                    self.stdout = stdout
-                    self.stderr = stderr
-
-                def communicate(self, timeout=None):
-                    return (b"ok", b"")
-
-                def wait(self):
-                    return self.returncode
-
-            def fake_popen(cmd, stdout=None, stderr=None, stdin=None, **kw):
-                # gunzip -> provide stdout pipe
-                if cmd and isinstance(cmd, (list, tuple)) and cmd[0].endswith("gunzip"):
-                    return MockProc(returncode=0, stdout=io.BytesIO(b"data"))
-                # head -> provide stdout pipe
-                if cmd and isinstance(cmd, (list, tuple)) and cmd[0].endswith("head"):
-                    return MockProc(returncode=0, stdout=io.BytesIO(b"data"))
-                # zstreamdump -> return success
-                if cmd and isinstance(cmd, (list, tuple)) and cmd[0].endswith("zstreamdump"):
-                    p = MockProc(returncode=0, stdout=io.BytesIO(b"ok"))
-                    return p
-                return MockProc(returncode=0, stdout=io.BytesIO(b""))
-
+            # gunzip (pigz/gzip) and head provide stdout pipes; zstreamdump succeeds
+            fake_popen = _fake_popen(_VERIFY_OK_RULES, default=(0, b"data", b""))
             with self.patched(subprocess, "Popen", fake_popen):
                 ok = ZFS.verify_backup_file(f, self.logger)
                 assert ok is True
 
     def test_lockfile_raises_when_locked(self):
         """Simulate flock raising and ensure LockFile.__enter__ raises FatalError."""
-        import zfs_simple_backup_restore as mod
 
         def fake_flock(fd, flags):
             raise Exception("already locked")
@@ -898,30 +973,19 @@ class TestSuite(TestBase):
         with self.tempdir(prefix="lockfail-") as td:
             p = Path(td) / "x.lock"
             with self.patched(mod.fcntl, "flock", fake_flock):
-                try:
+                with self.assert_raises(FatalError):
                     with LockFile(p, self.logger):
                         assert False, "Should not acquire lock when flock fails"
-                except FatalError:
-                    pass
 
     def test_backup_differential_no_base_full_raises(self):
         """If no base full exists in the chain, backup_differential should raise FatalError."""
         with self.tempdir(prefix="bdiff-nobase-") as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
-
             # Create last_chain_file and chain dir but no full files
             chain_name = "chain-20250101"
-            self.write_file(manager.last_chain_file, chain_name)
-            chain_dir = manager.target_dir / chain_name
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            manager = self.make_backup_manager(td, chain=chain_name)
 
-            try:
+            with self.assert_raises(FatalError, "Expected FatalError when no base full snapshot exists"):
                 manager.backup_differential()
-                assert False, "Expected FatalError when no base full snapshot exists"
-            except FatalError:
-                pass
 
     def test_restore_snapshot_not_found_raises(self):
         """If requested restore_snapshot cannot be found in chain, restore() should raise FatalError."""
@@ -937,72 +1001,41 @@ class TestSuite(TestBase):
             )
             target_dir = Path(args.mount_point) / args.dataset.replace("/", "_")
             chain_dir = target_dir / args.restore_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             # create one backup file that won't match 'nope'
             self.write_file(chain_dir / "TEST-full-20250101000000.zfs.gz", b"data")
 
             # Ensure verification passes so logic reaches snapshot lookup
-            with self.patched(ZFS, "verify_backup_file", lambda p, logger: True):
+            with self.patched(ZFS, "verify_backup_file", _verified):
                 mgr = RestoreManager(args, self.logger)
-                try:
+                with self.assert_raises(FatalError, "Expected FatalError when restore snapshot not found"):
                     mgr.restore()
-                    assert False, "Expected FatalError when restore snapshot not found"
-                except FatalError:
-                    pass
 
     def test_main_run_handles_fatalerror_exit(self):
         """Main.run should exit with error code when BackupManager.backup raises FatalError."""
-        import zfs_simple_backup_restore as mod
-        import sys
-
         with self.tempdir(prefix="main-run-") as td:
-            mount = td
-            # Prepare argv for a backup run
-            with self.patched(sys, "argv", ["script", "--action", "backup", "--dataset", "rpool/test", "--mount", str(mount)]):
+            fakes = {
+                # Prepare argv for a backup run
+                (sys, "argv"): ["script", "--action", "backup", "--dataset", "rpool/test", "--mount", str(td)],
                 # Patch validations to pass initially
-                with self.patched(Cmd, "has_required_binaries", lambda logger, rate=None: True):
-                    with self.patched(os, "geteuid", lambda: 0):
-                        with self.patched(ZFS, "is_dataset_exists", lambda d: True):
-                            # Replace BackupManager with one that raises FatalError on backup()
-                            class DummyBM:
-                                def __init__(self, args, logger):
-                                    pass
-
-                                def backup(self):
-                                    raise FatalError("simulated")
-
-                            with self.patched(mod, "BackupManager", DummyBM):
-                                # Patch LockFile to a no-op context manager
-                                class DummyLock:
-                                    def __init__(self, *a, **kw):
-                                        pass
-
-                                    def __enter__(self):
-                                        return self
-
-                                    def __exit__(self, exc_type, exc, tb):
-                                        return False
-
-                                with self.patched(mod, "LockFile", DummyLock):
-                                    try:
-                                        Main().run()
-                                        assert False, "Expected SystemExit from Main.run on FatalError"
-                                    except SystemExit as e:
-                                        assert e.code == CONFIG.EXIT_INVALID_ARGS
+                (Cmd, "has_required_binaries"): lambda logger, rate=None: True,
+                (os, "geteuid"): lambda: 0,
+                (ZFS, "is_dataset_exists"): lambda d: True,
+                # BackupManager raises FatalError on backup(); LockFile is a no-op
+                (mod, "BackupManager"): _FailingBackupManager,
+                (mod, "LockFile"): _NoopLock,
+            }
+            with self.patch_many(fakes):
+                with self.assert_raises(SystemExit, "Expected SystemExit from Main.run on FatalError") as ei:
+                    Main().run()
+                assert ei.value.code == CONFIG.EXIT_INVALID_ARGS
 
     def test_exceptions(self):
-        # Test that our custom exceptions work
-        try:
-            raise FatalError("Test fatal error")
-        except FatalError as e:
-            assert str(e) == "Test fatal error"
-
-        try:
-            raise ValidationError("Test validation error")
-        except ValidationError as e:
-            assert str(e) == "Test validation error"
+        # Test that our custom exceptions carry their message
+        for exc, msg in ((FatalError, "Test fatal error"), (ValidationError, "Test validation error")):
+            assert str(exc(msg)) == msg, f"{exc.__name__}: unexpected message"
 
-        # ValidationError should be a subclass of FatalError
+    def test_validation_error_is_fatal_error(self):
         assert issubclass(ValidationError, FatalError)
 
     # The following tests are destructive and require actual ZFS pools/datasets.
@@ -1012,26 +1045,21 @@ class TestSuite(TestBase):
     # directory, and restore to a separate pool, verifying data integrity.
 
     def test_destructive_full_backup_and_restore(self) -> None:
-        ctx = self.ctx
+        ctx = self.destructive_ctx()
         self.run_backup(ctx["dataset"], ctx["backup_dir"], "Initial backup")
         dataset_dir = Path(ctx["backup_dir"]) / ctx["dataset"].replace("/", "_")
-        chain_dirs = [p.name for p in dataset_dir.iterdir() if p.is_dir() and p.name.startswith("chain-")]
+        with os.scandir(dataset_dir) as it:
+            chain_dirs = [e.name for e in it if e.is_dir(follow_symlinks=False) and e.name.startswith("chain-")]
         if not chain_dirs:
             raise RuntimeError("No chain directory found after backup")
         ctx["chain_dir"] = dataset_dir / sorted(chain_dirs)[-1]
 
-        # Create restore pool and restore full
-        self.run_cmd(["zpool", "destroy", ctx["restore_pool"]], check=False)
-        self.run_cmd(["truncate", "-s", "1G", ctx["restore_pool_file"]])
-        self.run_cmd(["zpool", "create", ctx["restore_pool"], ctx["restore_pool_file"]])
+        # Restore full into the shared restore pool
         self.run_restore(ctx["dataset"], ctx["backup_dir"], ctx["restore_pool"], ctx["chain_dir"], capture_output=False)
 
         # Mount restored and verify initial contents
         ctx["restored_dataset"] = f"{ctx['restore_pool']}/{os.path.basename(ctx['dataset'])}"
-        ctx["mount_point"] = self.run_cmd(["zfs", "get", "-H", "-o", "value", "mountpoint", ctx["restored_dataset"]]).stdout.strip()
-        Path(ctx["mount_point"]).mkdir(parents=True, exist_ok=True)
-        if self.run_cmd(["zfs", "get", "-H", "-o", "value", "mounted", ctx["restored_dataset"]]).stdout.strip() != "yes":
-            self.run_cmd(["zfs", "mount", ctx["restored_dataset"]])
+        ctx["mount_point"] = str(self.mount_restored(ctx["restored_dataset"]))
 
         # Presence
         for rel in ["test_file.txt", "test_dir/subdir_file.txt", "binary_test.bin"]:
@@ -1049,34 +1077,30 @@ class TestSuite(TestBase):
         self.assert_equal(binp.read_bytes(), bytes([0x00, 1, 2, 3, 4, 5]), "Binary content mismatch")
 
     def test_destructive_incremental_backup(self) -> None:
-        ctx = self.ctx
+        ctx = self.destructive_ctx()
 
         # Write files into the source dataset mount to create an incremental change
         src_mount = Path("/") / ctx["dataset"]
         self.write_file(src_mount / "test_file.txt", "test data for backup verification")
         # Ensure subdir exists and write
-        (src_mount / "subdir").mkdir(parents=True, exist_ok=True)
+        _mkdirs(src_mount / "subdir")
         self.write_file(src_mount / "subdir" / "test2.txt", "test data 2 for backup verification")
 
         # Run incremental backup
         self.run_backup(ctx["dataset"], ctx["backup_dir"], "Incremental backup")
 
     def test_destructive_incremental_restore(self) -> None:
-        ctx = self.ctx
-        # Recreate restore pool and restore again
-        self.run_cmd(["zpool", "destroy", ctx["restore_pool"]], check=False)
-        if os.path.exists(ctx["restore_pool_file"]):
-            os.unlink(ctx["restore_pool_file"])
-        self.run_cmd(["truncate", "-s", "1G", ctx["restore_pool_file"]])
-        self.run_cmd(["zpool", "create", ctx["restore_pool"], ctx["restore_pool_file"]])
+        ctx = self.destructive_ctx()
+        restored_dataset = f"{ctx['restore_pool']}/{os.path.basename(ctx['dataset'])}"
+        # Drop the previously restored dataset and restore again; only rebuild
+        # the pool when it is missing or unhealthy
+        self.run_cmd(["zfs", "destroy", "-R", restored_dataset], check=False)
+        if self.run_cmd(["zpool", "list", "-H", "-o", "health", ctx["restore_pool"]], check=False).stdout.strip() != "ONLINE":
+            self.create_restore_pool(ctx)
         self.run_restore(ctx["dataset"], ctx["backup_dir"], ctx["restore_pool"])
 
         # Verify updated contents
-        restored_dataset = f"{ctx['restore_pool']}/{os.path.basename(ctx['dataset'])}"
-        mount_point = Path(self.run_cmd(["zfs", "get", "-H", "-o", "value", "mountpoint", restored_dataset]).stdout.strip())
-        mount_point.mkdir(parents=True, exist_ok=True)
-        if self.run_cmd(["zfs", "get", "-H", "-o", "value", "mounted", restored_dataset]).stdout.strip() != "yes":
-            self.run_cmd(["zfs", "mount", restored_dataset])
+        mount_point = self.mount_restored(restored_dataset)
         checks = [
             ("test_file.txt", "test data for backup verification"),
             ("subdir/test2.txt", "test data 2 for backup verification"),
@@ -1092,8 +1116,6 @@ class TestSuite(TestBase):
 
     def test_logger_init_handles_directory_creation_failure(self):
         """Test Logger.__init__ handles directory creation failure gracefully."""
-        import os
-        import tempfile
 
         # Mock os.makedirs to raise an exception
         def failing_makedirs(*args, **kwargs):
@@ -1108,7 +1130,6 @@ class TestSuite(TestBase):
 
     def test_logger_init_handles_log_file_open_failure(self):
         """Test Logger.__init__ handles log file open failure gracefully."""
-        import builtins
 
         # Mock open to raise an exception
         def failing_open(*args, **kwargs):
@@ -1126,18 +1147,8 @@ class TestSuite(TestBase):
 
     def test_logger_init_handles_journal_import_failure(self):
         """Test Logger.__init__ handles systemd journal import failure gracefully."""
-        from unittest.mock import patch
-        import builtins
-
-        # Mock the systemd import to raise ImportError
-        original_import = builtins.__import__
-
-        def mock_import(name, *args, **kwargs):
-            if name == "systemd":
-                raise ImportError("No module named 'systemd'")
-            return original_import(name, *args, **kwargs)
-
-        with patch("builtins.__import__", side_effect=mock_import):
+        # A None entry in sys.modules makes `from systemd import journal` raise ImportError
+        with self.patched_module("systemd", None):
             logger = Logger(verbose=True)
             assert logger.journal is None
             assert logger.journal_available == False
@@ -1145,75 +1156,66 @@ class TestSuite(TestBase):
 
     def test_zfs_verify_backup_file_handles_subprocess_errors(self):
         """Test ZFS.verify_backup_file handles subprocess errors in zstreamdump calls."""
-        import subprocess
-        from unittest.mock import Mock
-        from pathlib import Path
-
-    def test_logger_with_systemd_journal(self):
-        """Exercise Logger path when systemd.journal is available."""
-
-        # Insert a fake systemd.journal module to exercise the journal send path
-        class FakeJournal:
-            LOG_INFO = 6
-            LOG_ERR = 3
+        with self.tempdir() as td:
+            backup_file = Path(td) / "test.zfs.gz"
+            self.write_file(backup_file, b"fake backup data")
+            log = io.StringIO()
 
-            @staticmethod
-            def send(msg, **kw):
-                FakeJournal.last = (msg, kw)
+            # zstreamdump cannot be started (not a FileNotFoundError); gunzip/head start fine
+            fake_popen = _fake_popen(_VERIFY_OK_RULES)
 
-        import sys
+            def popen(cmd, *args, **kwargs):
+                if "zstreamdump" in _cmd_str(cmd):
+                    raise PermissionError("zstreamdump: permission denied")
+                return fake_popen(cmd, *args, **kwargs)
 
-        sys.modules.setdefault("systemd", type("M", (), {})())
-        sys.modules["systemd"].journal = FakeJournal
+            with self.patch_many({(subprocess, "Popen"): popen, (self.logger, "log_file"): log}):
+                assert ZFS.verify_backup_file(backup_file, self.logger) is False
+            assert "Failed to verify backup file test.zfs.gz: zstreamdump: permission denied" in log.getvalue()
 
-        logger = Logger(verbose=True)
+    def test_logger_with_systemd_journal(self):
+        """Exercise Logger path when systemd.journal is available."""
+        # Bind a fake systemd.journal module for this test only to exercise the journal send path
+        _FakeJournal.last = None
+        with self.patched_module("systemd", _FAKE_SYSTEMD):
+            logger = Logger(verbose=True)
         logger.info("info-msg")
         logger.always("always-msg")
         logger.error("err-msg")
-        assert hasattr(FakeJournal, "last")
+        assert _FakeJournal.last == ("err-msg", {"SYSLOG_IDENTIFIER": CONFIG.SCRIPT_ID, "PRIORITY": _FakeJournal.LOG_ERR})
 
     def test_zfs_verify_backup_file_timeout(self):
         """Ensure verify_backup_file returns False when zstreamdump times out and when zstreamdump fails."""
-        from pathlib import Path
-        import subprocess as _sub
-        import io
-        from unittest.mock import Mock
-
         # Case 1: zstreamdump times out
         with self.tempdir() as td:
             f = Path(td) / "fake.zfs.gz"
-            f.write_bytes(b"notreallygz")
+            self.write_file(f, b"notreallygz")
 
             class MockPopen:
                 def __init__(self, cmd, stdin=None, stdout=None, stderr=None, **kw):
                     self.cmd = cmd
-                    try:
-                        self.stdout = io.BytesIO(b"data")
-                    except Exception:
-                        self.stdout = None
-                    self.stderr = io.BytesIO(b"")
+                    self.stdout = io.BytesIO(b"data")
+                    self.stderr = _EMPTY_PIPE
                     self.returncode = 0
 
                 def communicate(self, timeout=None):
-                    cmdstr = " ".join(self.cmd if isinstance(self.cmd, (list, tuple)) else [str(self.cmd)])
+                    cmdstr = _cmd_str(self.cmd)
                     if "zstreamdump" in cmdstr:
-                        raise _sub.TimeoutExpired(cmdstr, timeout or 1)
+                        raise subprocess.TimeoutExpired(cmdstr, timeout or 1)
                     return (b"", b"")
 
-            orig_popen = _sub.Popen
-            _sub.Popen = MockPopen
+            orig_popen = subprocess.Popen
+            subprocess.Popen = MockPopen
             try:
                 ok = ZFS.verify_backup_file(f, self.logger)
                 assert ok is False
             finally:
-                _sub.Popen = orig_popen
+                subprocess.Popen = orig_popen
 
         # Case 2: zstreamdump present but returns non-zero
-        import subprocess
-
         with self.tempdir() as td:
             backup_file = Path(td) / "test.zfs.gz"
-            backup_file.write_bytes(b"fake backup data")
+            self.write_file(backup_file, b"fake backup data")
 
             mock_proc = Mock()
             mock_proc.returncode = 1
@@ -1222,10 +1224,7 @@ class TestSuite(TestBase):
             mock_proc.stderr = None
 
             def mock_popen(cmd, **kwargs):
-                try:
-                    is_zstream = any("zstreamdump" in str(c) for c in cmd)
-                except Exception:
-                    is_zstream = "zstreamdump" in str(cmd)
+                is_zstream = "zstreamdump" in _cmd_str(cmd)
                 if is_zstream:
                     return mock_proc
                 success_proc = Mock()
@@ -1240,18 +1239,12 @@ class TestSuite(TestBase):
 
     def test_backup_differential_calls_backup_full_when_snapshot_missing(self):
         """If base full exists but snapshot is missing, backup_differential should call backup_full()."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
             # prepare last_chain and full file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            manager = self.make_backup_manager(td, chain="chain-20240101")
             last_chain = manager.target_dir / "chain-20240101"
-            last_chain.mkdir(parents=True, exist_ok=True)
-            manager.last_chain_file.write_text("chain-20240101")
             full_file = last_chain / "TEST-full-20240101120000.zfs.gz"
-            full_file.write_bytes(b"fake")
+            self.write_file(full_file, b"fake")
 
             called = {"backup_full": False}
 
@@ -1265,91 +1258,44 @@ class TestSuite(TestBase):
 
     def test_backup_full_cleanup_when_pipeline_fails_and_destroy_fails(self):
         """If pipeline fails during full backup, tmpfile should be removed and destroy cleanup error path exercised."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            # Patch ProcessPipeline.run_with_rate_limit to write a tmpfile then raise
-            def fake_run_with_rate_limit(source_cmd, tmpfile, rate, compression_cmd):
-                # create the tmpfile to simulate a partially-written file
-                Path(tmpfile).write_bytes(b"partial")
-                raise Exception("pipeline-boom")
+            manager = self.make_backup_manager(td)
 
-            # Patch ZFS.run so snapshot creation succeeds but destroy raises
+            # Snapshot creation succeeds but destroy raises
             def fake_zfs_run(cmd, logger, dry_run=False):
-                cmd_str = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
-                if "snapshot" in cmd_str:
-                    return None
-                if "destroy" in cmd_str:
+                if "destroy" in _cmd_str(cmd):
                     raise Exception("destroy-boom")
                 return None
 
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run):
-                    try:
-                        manager.backup_full()
-                        assert False, "Expected FatalError from backup_full"
-                    except FatalError:
-                        # Ensure tmpfile was cleaned up (run_with_rate_limit created then code removed it)
-                        # The chain dir should exist but no tmp files remain
-                        # We can't know the exact snap name, but ensure no .tmp files exist under target_dir
-                        tmp_tmps = list(manager.target_dir.rglob("*.tmp"))
-                        assert not tmp_tmps, f"Found leftover tmp files: {tmp_tmps}"
+            # The pipeline writes a partial tmpfile then fails
+            with self.mock_backup_env(b"partial", Exception("pipeline-boom"), zfs_run=fake_zfs_run):
+                with self.assert_raises(FatalError, "Expected FatalError from backup_full"):
+                    manager.backup_full()
+                # Ensure tmpfile was cleaned up (run_with_rate_limit created then code removed it)
+                # The chain dir should exist but no tmp files remain
+                # We can't know the exact snap name, but ensure no .tmp files exist under target_dir
+                self.assert_no_tmp_files(manager.target_dir)
 
     def test_backup_full_cleanup_when_pipeline_fails_and_destroy_succeeds(self):
         """If pipeline fails during full backup, tmpfile should be removed and destroy success path exercised."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
+            manager = self.make_backup_manager(td)
 
-            # Patch ProcessPipeline.run_with_rate_limit to write a tmpfile then raise
-            def fake_run_with_rate_limit(source_cmd, tmpfile, rate, compression_cmd):
-                Path(tmpfile).write_bytes(b"partial")
-                raise Exception("pipeline-boom")
-
-            # Patch ZFS.run so snapshot creation and destroy both succeed
-            def fake_zfs_run_ok(cmd, logger, dry_run=False):
-                return None
-
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run_ok):
-                    try:
-                        manager.backup_full()
-                        assert False, "Expected FatalError from backup_full"
-                    except FatalError:
-                        # Ensure tmpfile was cleaned up
-                        tmp_tmps = list(manager.target_dir.rglob("*.tmp"))
-                        assert not tmp_tmps, f"Found leftover tmp files: {tmp_tmps}"
+            # The pipeline writes a partial tmpfile then fails; snapshot creation and destroy both succeed
+            with self.mock_backup_env(b"partial", Exception("pipeline-boom")):
+                with self.assert_raises(FatalError, "Expected FatalError from backup_full"):
+                    manager.backup_full()
+                # Ensure tmpfile was cleaned up
+                self.assert_no_tmp_files(manager.target_dir)
 
     def test_backup_full_success_path_creates_final_file_and_writes_last_chain(self):
         """Simulate a successful full backup pipeline and verify final file exists and last_chain_file updated."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            # Simulate run_with_rate_limit writing a tmpfile successfully
-            def fake_run_with_rate_limit(self, source_cmd, tmpfile, rate, compression_cmd):
-                Path(tmpfile).write_bytes(b"valid zfs stream")
-                return None
-
-            # Ensure snapshot creation succeeds and destroy not needed
-            def fake_zfs_run_ok(cmd, logger, dry_run=False):
-                return None
-
-            # Ensure verification returns True
-            def fake_verify(path, logger):
-                return True
+            manager = self.make_backup_manager(td)
 
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run_ok):
-                    with self.patched(ZFS, "verify_backup_file", fake_verify):
-                        manager.backup_full()
+            # The pipeline writes a tmpfile, snapshot creation succeeds and verification passes
+            with self.mock_backup_env(b"valid zfs stream"):
+                manager.backup_full()
 
             # After successful run, ensure final .zfs.gz exists in the today's chain dir
             chain_name = manager.chain.today()
@@ -1359,69 +1305,36 @@ class TestSuite(TestBase):
             # last_chain_file should be written with current chain name
             assert manager.last_chain_file.read_text().strip() == chain_name
 
-    def test_backup_full_empty_tmpfile_triggers_cleanup(self):
-        """If pipeline produces an empty tmpfile, backup_full should clean it up and raise FatalError."""
-        from unittest.mock import Mock
+    def test_backup_full_failed_stream_triggers_cleanup(self):
+        """An empty tmpfile, a failed verification or a raising verify all clean up, destroy the snapshot and raise FatalError."""
 
-        with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            # Simulate run_with_rate_limit creating an empty tmpfile
-            def fake_run_with_rate_limit(self, source_cmd, tmpfile, rate, compression_cmd):
-                Path(tmpfile).write_bytes(b"")
-                return None
-
-            def fake_zfs_run_ok(cmd, logger, dry_run=False):
-                return None
+        def verify_raises(path, logger):
+            raise Exception("verify-boom")
 
-            # verify_backup_file should not be called (empty), but patch to be safe
-            def fake_verify(path, logger):
-                return True
-
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run_ok):
-                    with self.patched(ZFS, "verify_backup_file", fake_verify):
-                        try:
-                            manager.backup_full()
-                            assert False, "Expected FatalError due to empty tmpfile"
-                        except FatalError:
-                            # Ensure no .tmp files left
-                            tmp_tmps = list(manager.target_dir.rglob("*.tmp"))
-                            assert not tmp_tmps, f"Found leftover tmp files: {tmp_tmps}"
-
-    def test_backup_full_verification_failure_triggers_cleanup(self):
-        """If verification fails after pipeline, backup_full should clean up and raise FatalError."""
-        from unittest.mock import Mock
-
-        with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            def fake_run_with_rate_limit(self, source_cmd, tmpfile, rate, compression_cmd):
-                Path(tmpfile).write_bytes(b"not a valid stream")
-                return None
-
-            def fake_zfs_run_ok(cmd, logger, dry_run=False):
-                return None
+        # (tmpfile payload, verify_backup_file fake); the empty tmpfile should never reach verify
+        cases = (
+            (b"", _verified),
+            (b"not a valid stream", _not_verified),
+            (b"some-data", verify_raises),
+        )
+        for payload, verify in cases:
+            calls = []
 
-            def fake_verify_false(path, logger):
-                return False
+            def fake_zfs_run_recorder(cmd, logger, dry_run=False):
+                calls.append(_cmd_str(cmd))
 
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run_ok):
-                    with self.patched(ZFS, "verify_backup_file", fake_verify_false):
-                        try:
-                            manager.backup_full()
-                            assert False, "Expected FatalError due to verification failure"
-                        except FatalError:
-                            tmp_tmps = list(manager.target_dir.rglob("*.tmp"))
-                            assert not tmp_tmps, f"Found leftover tmp files: {tmp_tmps}"
+            with self.tempdir() as td:
+                manager = self.make_backup_manager(td)
+                with self.mock_backup_env(payload, zfs_run=fake_zfs_run_recorder, verify=verify):
+                    with self.assert_raises(FatalError, f"Expected FatalError for payload {payload!r}"):
+                        manager.backup_full()
+                # tmp .tmp files should be removed
+                self.assert_no_tmp_files(manager.target_dir)
+                # destroy should have been attempted (look for 'destroy' in recorded commands)
+                assert any("destroy" in c for c in calls), f"Expected destroy to be called in cleanup, calls: {calls}"
 
     def test_backup_full_dry_run_writes_last_chain_no_files(self):
         """When dry_run=True, backup_full should not create backup files but should write last_chain_file."""
-        from pathlib import Path
-
         with self.tempdir() as td:
             args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=True)
             manager = BackupManager(args, self.logger)
@@ -1438,47 +1351,8 @@ class TestSuite(TestBase):
             # last_chain_file should be written
             assert manager.last_chain_file.read_text().strip() == chain_name
 
-    def test_backup_full_verify_raises_exception_triggers_cleanup_and_destroy_called(self):
-        """If verify raises, ensure tmpfile cleaned and destroy called during cleanup."""
-        from unittest.mock import Mock
-        from pathlib import Path
-
-        with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            # Create a tmpfile via run_with_rate_limit
-            def fake_run_with_rate_limit(self, source_cmd, tmpfile, rate, compression_cmd):
-                Path(tmpfile).write_bytes(b"some-data")
-                return None
-
-            calls = []
-
-            def fake_zfs_run_recorder(cmd, logger, dry_run=False):
-                calls.append(" ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd))
-                return None
-
-            def fake_verify_raises(path, logger):
-                raise Exception("verify-boom")
-
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run_recorder):
-                    with self.patched(ZFS, "verify_backup_file", fake_verify_raises):
-                        try:
-                            manager.backup_full()
-                            assert False, "Expected FatalError due to verify exception"
-                        except FatalError:
-                            # tmp .tmp files should be removed
-                            tmp_tmps = list(manager.target_dir.rglob("*.tmp"))
-                            assert not tmp_tmps, f"Found leftover tmp files: {tmp_tmps}"
-                            # destroy should have been attempted (look for 'destroy' in recorded commands)
-                            assert any("destroy" in c for c in calls), f"Expected destroy to be called in cleanup, calls: {calls}"
-
     def test_main_run_handles_validation_and_unexpected_errors(self):
         """Main.run should exit with the correct code on ValidationError and other Exceptions."""
-        import sys
-        from unittest.mock import Mock
-
         main = Main()
         # supply minimal args/logger
         main.args = Args(action="backup", dataset="rpool/test", mount_point="/tmp")
@@ -1493,11 +1367,9 @@ class TestSuite(TestBase):
 
         with self.patched(Main, "parse_args", fake_parse_args):
             with self.patched(Main, "validate", fake_validate_bad):
-                try:
+                with self.assert_raises(SystemExit, "Should have exited") as ei:
                     main.run()
-                    assert False, "Should have exited"
-                except SystemExit as e:
-                    assert e.code == CONFIG.EXIT_INVALID_ARGS
+                assert ei.value.code == CONFIG.EXIT_INVALID_ARGS
 
         # Case B: unexpected Exception
         def fake_validate_boom(self):
@@ -1505,17 +1377,12 @@ class TestSuite(TestBase):
 
         with self.patched(Main, "parse_args", fake_parse_args):
             with self.patched(Main, "validate", fake_validate_boom):
-                try:
+                with self.assert_raises(SystemExit, "Should have exited") as ei:
                     main.run()
-                    assert False, "Should have exited"
-                except SystemExit as e:
-                    assert e.code == CONFIG.EXIT_INVALID_ARGS
+                assert ei.value.code == CONFIG.EXIT_INVALID_ARGS
 
     def test_main_run_handles_unexpected_exception_from_backup_manager(self):
         """Main.run should catch unexpected exceptions from BackupManager.backup and exit."""
-        import sys
-        from unittest.mock import Mock
-
         main = Main()
         main.args = Args(action="backup", dataset="rpool/test", mount_point="/tmp")
         main.logger = self.logger
@@ -1532,29 +1399,20 @@ class TestSuite(TestBase):
         with self.patched(Main, "parse_args", fake_parse_args):
             with self.patched(Main, "validate", fake_validate):
                 with self.patched(BackupManager, "backup", fake_backup):
-                    try:
+                    with self.assert_raises(SystemExit, "Should have exited") as ei:
                         main.run()
-                        assert False, "Should have exited"
-                    except SystemExit as e:
-                        assert e.code == CONFIG.EXIT_INVALID_ARGS
+                    assert ei.value.code == CONFIG.EXIT_INVALID_ARGS
 
     def test_zfs_verify_backup_file_handles_file_not_found(self):
         """Test ZFS.verify_backup_file handles missing zstreamdump binary."""
-        import subprocess
-        from unittest.mock import Mock
-        from pathlib import Path
-
         with self.tempdir() as td:
             backup_file = Path(td) / "test.zfs.gz"
-            backup_file.write_bytes(b"fake backup data")
+            self.write_file(backup_file, b"fake backup data")
 
             # Mock subprocess.Popen to raise FileNotFoundError for zstreamdump
             def mock_popen(cmd, **kwargs):
                 # cmd may be list; detect zstreamdump by substring match
-                try:
-                    is_zstream = any("zstreamdump" in str(c) for c in cmd)
-                except Exception:
-                    is_zstream = "zstreamdump" in str(cmd)
+                is_zstream = "zstreamdump" in _cmd_str(cmd)
                 if is_zstream:
                     raise FileNotFoundError("zstreamdump command not found")
                 # For gunzip and head, return successful mocks
@@ -1570,10 +1428,7 @@ class TestSuite(TestBase):
 
         # Test verification failure with invalid stream
         def mock_popen_invalid(cmd, **kwargs):
-            try:
-                is_zstream = any("zstreamdump" in str(c) for c in cmd)
-            except Exception:
-                is_zstream = "zstreamdump" in str(cmd)
+            is_zstream = "zstreamdump" in _cmd_str(cmd)
             if is_zstream:
                 invalid_proc = Mock()
                 invalid_proc.returncode = 1
@@ -1593,50 +1448,33 @@ class TestSuite(TestBase):
 
     def test_processpipeline_run_simple_calledprocesserror(self):
         """ProcessPipeline.run_simple should log and re-raise CalledProcessError."""
-        import subprocess
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
         def fake_run(*a, **kw):
             raise subprocess.CalledProcessError(2, a[0], stderr=b"failure")
 
         with self.patched(subprocess, "run", fake_run):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError"):
                 pipeline.run_simple(["false"])
-                assert False, "Expected CalledProcessError"
-            except subprocess.CalledProcessError:
-                pass
 
         # Test with no stderr
         def fake_run_no_stderr(*a, **kw):
             raise subprocess.CalledProcessError(2, a[0])
 
         with self.patched(subprocess, "run", fake_run_no_stderr):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError"):
                 pipeline.run_simple(["false"])
-                assert False, "Expected CalledProcessError"
-            except subprocess.CalledProcessError:
-                pass
 
         # Test with unexpected exception
         def fake_run_unexpected(*a, **kw):
             raise ValueError("Unexpected error")
 
         with self.patched(subprocess, "run", fake_run_unexpected):
-            try:
+            with self.assert_raises(ValueError, "Expected ValueError"):
                 pipeline.run_simple(["false"])
-                assert False, "Expected ValueError"
-            except ValueError:
-                pass
 
     def test_processpipeline_run_simple_timeout_and_filenotfound(self):
         """ProcessPipeline.run_simple should handle TimeoutExpired and FileNotFoundError."""
-        import subprocess
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
         # TimeoutExpired
@@ -1644,78 +1482,34 @@ class TestSuite(TestBase):
             raise subprocess.TimeoutExpired(cmd=a[0], timeout=1)
 
         with self.patched(subprocess, "run", fake_run_timeout):
-            try:
+            with self.assert_raises(subprocess.TimeoutExpired, "Expected TimeoutExpired"):
                 pipeline.run_simple(["sleep"])
-                assert False, "Expected TimeoutExpired"
-            except subprocess.TimeoutExpired:
-                pass
 
         # FileNotFoundError
         def fake_run_notfound(*a, **kw):
             raise FileNotFoundError()
 
         with self.patched(subprocess, "run", fake_run_notfound):
-            try:
+            with self.assert_raises(FileNotFoundError, "Expected FileNotFoundError"):
                 pipeline.run_simple(["no-such-cmd"])
-                assert False, "Expected FileNotFoundError"
-            except FileNotFoundError:
-                pass
 
     def test_processpipeline_run_pipeline_no_commands_and_proc_error(self):
         """Run pipeline with no commands should raise ValueError; failing proc should raise CalledProcessError."""
-        import subprocess
-        import io
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
         # No commands
-        try:
+        with self.assert_raises(ValueError, "Expected ValueError for no commands"):
             pipeline.run_pipeline([])
-            assert False, "Expected ValueError for no commands"
-        except ValueError:
-            pass
-
-        # Simulate a failing process in the pipeline
-        class MockProc:
-            def __init__(self, returncode=0, stdout=None, stderr=None, communicate_ret=(b"", b"err")):
-                self.returncode = returncode
-                self.stdout = stdout
-                self.stderr = stderr or io.BytesIO(b"err")
-                self._communicate_ret = communicate_ret
-
-            def communicate(self, timeout=None):
-                return self._communicate_ret
-
-            def wait(self):
-                return self.returncode
-
-        call_idx = {"i": 0}
 
-        def fake_popen(cmd, stdin=None, stdout=None, stderr=None, **kw):
-            # first process: provides stdout pipe
-            if call_idx["i"] == 0:
-                p = MockProc(returncode=0, stdout=io.BytesIO(b"data"), communicate_ret=(b"", b""))
-            else:
-                # last process fails
-                p = MockProc(returncode=1, stdout=None, communicate_ret=(b"", b"err"))
-            call_idx["i"] += 1
-            return p
+        # Simulate a failing process in the pipeline: the first provides a stdout pipe, the last fails
+        fake_popen = _popen_sequence(_FakeProc(0, b"data"), _FakeProc(1, err=b"err"))
 
         with self.patched(subprocess, "Popen", fake_popen):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError from failing pipeline proc"):
                 pipeline.run_pipeline([["echo"], ["false"]])
-                assert False, "Expected CalledProcessError from failing pipeline proc"
-            except subprocess.CalledProcessError:
-                pass
 
     def test_run_with_rate_limit_single_command_uses_run(self):
         """run_with_rate_limit should call subprocess.run for single-command case."""
-        import subprocess
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
         called = {"cmd": None}
@@ -1736,141 +1530,35 @@ class TestSuite(TestBase):
 
     def test_processpipeline_run_pipeline_intermediate_proc_error_logs_and_raises(self):
         """Simulate an intermediate pipeline process failing with stderr and ensure CalledProcessError is raised."""
-        import subprocess
-        import io
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
-        class MockProc:
-            def __init__(self, returncode=0, stdout=None, stderr=b"", communicate_ret=(b"", b"")):
-                self.returncode = returncode
-                self.stdout = stdout
-                # stderr should be file-like for .read()
-                self.stderr = io.BytesIO(stderr) if stderr is not None else None
-                self._communicate_ret = communicate_ret
-
-            def communicate(self, timeout=None):
-                return self._communicate_ret
-
-            def wait(self, timeout=None):
-                return self.returncode
-
-            def poll(self):
-                return self.returncode
-
-            def terminate(self):
-                pass
-
-            def kill(self):
-                pass
-
-        call = {"i": 0}
-
-        def fake_popen(cmd, stdin=None, stdout=None, stderr=None, **kw):
-            # first process: success with stdout pipe
-            if call["i"] == 0:
-                p = MockProc(returncode=0, stdout=io.BytesIO(b"data"), communicate_ret=(b"", b""))
-            elif call["i"] == 1:
-                # intermediate process fails
-                p = MockProc(returncode=1, stdout=io.BytesIO(b""), stderr=b"intermediate error", communicate_ret=(b"", b"intermediate error"))
-            else:
-                # final process
-                p = MockProc(returncode=0, stdout=None, communicate_ret=(b"ok", b""))
-            call["i"] += 1
-            return p
+        # first process succeeds with a stdout pipe, the intermediate one fails, the final one succeeds
+        fake_popen = _popen_sequence(_FakeProc(0, b"data"), _FakeProc(1, err=b"intermediate error"), _FakeProc(0, b"ok"))
 
         with self.patched(subprocess, "Popen", fake_popen):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError from intermediate failing process"):
                 pipeline.run_pipeline([["first"], ["intermediate"], ["final"]])
-                assert False, "Expected CalledProcessError from intermediate failing process"
-            except subprocess.CalledProcessError:
-                pass
 
     def test_processpipeline_run_pipeline_final_proc_error_logs_and_raises(self):
         """Test run_pipeline logs and raises CalledProcessError when final process fails."""
-        import subprocess
-        import io
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
-        # Mock successful processes
-        class MockProc:
-            def __init__(self, returncode=0, stdout=None, stderr=None, communicate_ret=(b"", b"")):
-                self.returncode = returncode
-                self.stdout = stdout or io.BytesIO(b"")
-                self.stderr = stderr or io.BytesIO(b"")
-                self._communicate_ret = communicate_ret
-
-            def communicate(self, timeout=None):
-                return self._communicate_ret
-
-            def poll(self):
-                return self.returncode
-
-            def terminate(self):
-                pass
-
-            def wait(self, timeout=None):
-                return self.returncode
-
-            def kill(self):
-                pass
-
-        call_idx = {"i": 0}
-
-        def fake_popen(cmd, stdin=None, stdout=None, stderr=None, **kw):
-            if call_idx["i"] < 1:
-                p = MockProc()
-            else:
-                p = MockProc(returncode=1, communicate_ret=(b"", b"err"))
-            call_idx["i"] += 1
-            return p
+        # First process succeeds, the final one fails
+        fake_popen = _popen_sequence(_FakeProc(), _FakeProc(1, err=b"err"))
 
         with self.patched(subprocess, "Popen", fake_popen):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError from failing final pipeline proc"):
                 pipeline.run_pipeline([["echo"], ["false"]])
-                assert False, "Expected CalledProcessError from failing final pipeline proc"
-            except subprocess.CalledProcessError:
-                pass
 
     def test_processpipeline_run_pipeline_timeout_triggers_cleanup(self):
         """If final process.communicate raises TimeoutExpired, the pipeline should propagate it and cleanup."""
-        import subprocess
-        import io
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
-        class FastProc:
-            def __init__(self):
-                self.returncode = 0
-                self.stdout = io.BytesIO(b"data")
-
-            def communicate(self, timeout=None):
-                return (b"", b"")
-
-            def wait(self, timeout=None):
-                return 0
-
-            def poll(self):
-                return 0
-
-            def terminate(self):
-                pass
-
-            def kill(self):
-                pass
-
         class SlowFinalProc:
             def __init__(self):
                 self.returncode = None
                 self.stdout = None
-                self.stderr = io.BytesIO(b"")
+                self.stderr = _EMPTY_PIPE
 
             def communicate(self, timeout=None):
                 raise subprocess.TimeoutExpired(cmd="final", timeout=timeout)
@@ -1887,60 +1575,17 @@ class TestSuite(TestBase):
             def kill(self):
                 pass
 
-        call = {"i": 0}
-
-        def fake_popen(cmd, stdin=None, stdout=None, stderr=None, **kw):
-            if call["i"] < 2:
-                p = FastProc()
-            else:
-                p = SlowFinalProc()
-            call["i"] += 1
-            return p
+        fake_popen = _popen_sequence(_FakeProc(0, b"data"), _FakeProc(0, b"data"), SlowFinalProc())
 
         with self.patched(subprocess, "Popen", fake_popen):
-            try:
+            with self.assert_raises(subprocess.TimeoutExpired, "Expected TimeoutExpired"):
                 pipeline.run_pipeline([["a"], ["b"], ["final"]], timeout=0.1)
-                assert False, "Expected TimeoutExpired"
-            except subprocess.TimeoutExpired:
-                pass
 
     def test_processpipeline_run_pipeline_with_input_data(self):
         """Test run_pipeline with input_data to cover the input_data branch."""
-        import subprocess
-        import io
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
-        # Mock successful processes
-        class MockProc:
-            def __init__(self):
-                self.returncode = 0
-                self.stdout = io.BytesIO(b"output")
-                self.stderr = io.BytesIO(b"")
-                self.stdin = io.BytesIO()
-
-            def communicate(self, timeout=None):
-                return self.stdout.getvalue(), self.stderr.getvalue()
-
-            def poll(self):
-                return 0
-
-            def terminate(self):
-                pass
-
-            def wait(self, timeout=None):
-                return 0
-
-            def kill(self):
-                pass
-
-        def fake_popen(cmd, stdin=None, stdout=None, stderr=None, **kw):
-            p = MockProc()
-            if stdin == subprocess.PIPE:
-                p.stdin = io.BytesIO()
-            return p
+        fake_popen = _popen_sequence(_FakeProc(0, b"output"))
 
         with self.patched(subprocess, "Popen", fake_popen):
             result = pipeline.run_pipeline([["echo", "test"]], input_data=b"input")
@@ -1948,8 +1593,6 @@ class TestSuite(TestBase):
 
     def test_basemanager_validation_handles_missing_dataset(self):
         """Test BaseManager validation handles missing dataset."""
-        import os
-
         with self.tempdir() as td:
             args = Args(action="backup", dataset="nonexistent/dataset", mount_point=str(td))
             main = Main()
@@ -1960,16 +1603,11 @@ class TestSuite(TestBase):
             with self.patched(os, "geteuid", lambda: 0):
                 # Mock ZFS.is_dataset_exists to return False
                 with self.patched(ZFS, "is_dataset_exists", lambda ds: False):
-                    try:
+                    with self.assert_raises(ValidationError, "Should have raised ValidationError"):
                         main.validate()
-                        assert False, "Should have raised ValidationError"
-                    except ValidationError:
-                        pass
 
     def test_basemanager_validation_handles_missing_pool(self):
         """Test BaseManager validation handles missing restore pool."""
-        import os
-
         with self.tempdir() as td:
             args = Args(action="restore", dataset="rpool/test", mount_point=str(td), restore_pool="nonexistent")
             main = Main()
@@ -1981,16 +1619,11 @@ class TestSuite(TestBase):
                 # Mock ZFS methods
                 with self.patched(ZFS, "is_dataset_exists", lambda ds: True):
                     with self.patched(ZFS, "is_pool_exists", lambda pool: False):
-                        try:
+                        with self.assert_raises(ValidationError, "Should have raised ValidationError"):
                             main.validate()
-                            assert False, "Should have raised ValidationError"
-                        except ValidationError:
-                            pass
 
     def test_basemanager_validation_handles_non_directory_mount(self):
         """Test BaseManager validation handles non-directory mount point."""
-        import os
-
         with self.tempdir() as td:
             mount_point = Path(td) / "not_a_dir"
             mount_point.write_text("not a directory")
@@ -2004,30 +1637,22 @@ class TestSuite(TestBase):
             with self.patched(os, "geteuid", lambda: 0):
                 # Mock ZFS.is_dataset_exists to return True
                 with self.patched(ZFS, "is_dataset_exists", lambda ds: True):
-                    try:
+                    with self.assert_raises(ValidationError, "Should have raised ValidationError"):
                         main.validate()
-                        assert False, "Should have raised ValidationError"
-                    except ValidationError:
-                        pass
 
     def test_backup_manager_backup_full_backup_success(self):
         """Test successful full backup execution with all subprocess calls."""
-        import subprocess
-        from unittest.mock import Mock, patch
-        from pathlib import Path
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
+            manager = self.make_backup_manager(td)
 
             # Ensure target directory exists and no last_chain file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(manager.target_dir)
             if manager.last_chain_file.exists():
                 manager.last_chain_file.unlink()
 
             # Mock ZFS methods
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
-                with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+            with self.patched(ZFS, "run", _ok):
+                with self.patched(ZFS, "verify_backup_file", _verified):
                     # Use central patched_pipeline helper to get a mock pipeline whose
                     # run_with_rate_limit writes a tmpfile by default.
                     with self.patched_pipeline() as mock_pipeline:
@@ -2036,31 +1661,18 @@ class TestSuite(TestBase):
 
     def test_backup_manager_backup_differential_success(self):
         """Test successful differential backup execution."""
-        import subprocess
-        from unittest.mock import Mock, patch
-        from pathlib import Path
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            # Ensure target directory exists
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            # Create a fake last_chain file and chain directory to trigger differential backup
+            manager = self.make_backup_manager(td, chain="chain-20241231")
 
-            # Create a fake last_chain file to trigger differential backup
-            last_chain_file = manager.last_chain_file
-            last_chain_file.parent.mkdir(parents=True, exist_ok=True)
-            last_chain_file.write_text("chain-20241231")
-
-            # Create fake chain directory with a full backup file
+            # Add a full backup file to the chain
             chain_dir = manager.target_dir / "chain-20241231"
-            chain_dir.mkdir(parents=True, exist_ok=True)
             full_backup = chain_dir / "TEST-full-20241231120000.zfs.gz"
-            full_backup.write_bytes(b"fake backup data")
+            self.write_file(full_backup, b"fake backup data")
 
             # Mock ZFS methods. Ensure snapshot existence check returns True so differential path is used.
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
-                with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+            with self.patched(ZFS, "run", _ok):
+                with self.patched(ZFS, "verify_backup_file", _verified):
                     with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
                         # Use central patched_pipeline helper to get a mock pipeline
                         with self.patched_pipeline() as mock_pipeline:
@@ -2069,31 +1681,26 @@ class TestSuite(TestBase):
 
     def test_backup_manager_backup_differential_dry_run(self):
         """Test differential backup with dry_run=True."""
-        import subprocess
-        from unittest.mock import Mock, patch
-        from pathlib import Path
-
         with self.tempdir() as td:
             args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=True)
             manager = BackupManager(args, self.logger)
 
             # Ensure target directory exists
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(manager.target_dir)
 
             # Create a fake last_chain file to trigger differential backup
             last_chain_file = manager.last_chain_file
-            last_chain_file.parent.mkdir(parents=True, exist_ok=True)
             last_chain_file.write_text("chain-20241231")
 
             # Create fake chain directory with a full backup file
             chain_dir = manager.target_dir / "chain-20241231"
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             full_backup = chain_dir / "TEST-full-20241231120000.zfs.gz"
-            full_backup.write_bytes(b"fake backup data")
+            self.write_file(full_backup, b"fake backup data")
 
             # Mock ZFS methods. Ensure snapshot existence check returns True so differential path is used.
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
-                with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+            with self.patched(ZFS, "run", _ok):
+                with self.patched(ZFS, "verify_backup_file", _verified):
                     with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
                         # Use central patched_pipeline helper to get a mock pipeline
                         with self.patched_pipeline() as mock_pipeline:
@@ -2103,13 +1710,10 @@ class TestSuite(TestBase):
 
     def test_backup_manager_backup_handles_rate_limiting(self):
         """Test backup with rate limiting (pv command)."""
-        import subprocess
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
             args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", rate="10M", dry_run=False)
             manager = BackupManager(args, self.logger)
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(manager.target_dir)
 
             # Mock successful subprocess calls for pipeline with pv
             call_count = 0
@@ -2129,8 +1733,8 @@ class TestSuite(TestBase):
                 return mock_proc
 
             # Mock ZFS methods
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
-                with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+            with self.patched(ZFS, "run", _ok):
+                with self.patched(ZFS, "verify_backup_file", _verified):
                     with self.patched(subprocess, "Popen", mock_popen):
                         with self.patched(Path, "stat", lambda self: Mock(st_size=1024)):
                             # Should not raise exception
@@ -2138,13 +1742,9 @@ class TestSuite(TestBase):
 
     def test_backup_manager_backup_handles_empty_backup_file(self):
         """Test backup handles empty backup file error."""
-        import subprocess
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            manager = self.make_backup_manager(td)
+            _mkdirs(manager.target_dir)
 
             # Mock successful subprocess calls but empty file
             mock_proc = Mock()
@@ -2155,25 +1755,19 @@ class TestSuite(TestBase):
                 return mock_proc
 
             # Mock ZFS methods
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
+            with self.patched(ZFS, "run", _ok):
                 with self.patched(subprocess, "Popen", mock_popen):
                     with self.patched(Path, "stat", lambda self: Mock(st_size=0)):
                         # Should raise FatalError for empty backup
-                        try:
+                        with self.assert_raises(FatalError, "Should have raised FatalError for empty backup") as ei:
                             manager.backup_full()
-                            assert False, "Should have raised FatalError for empty backup"
-                        except FatalError as e:
-                            assert "empty" in str(e).lower()
+                        assert "empty" in str(ei.value).lower()
 
     def test_backup_manager_backup_handles_verification_failure(self):
         """Test backup handles backup verification failure."""
-        import subprocess
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            manager = self.make_backup_manager(td)
+            _mkdirs(manager.target_dir)
 
             # Mock successful subprocess calls
             mock_proc = Mock()
@@ -2184,26 +1778,20 @@ class TestSuite(TestBase):
                 return mock_proc
 
             # Mock ZFS methods - verification fails
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
-                with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: False):
+            with self.patched(ZFS, "run", _ok):
+                with self.patched(ZFS, "verify_backup_file", _not_verified):
                     with self.patched(subprocess, "Popen", mock_popen):
                         with self.patched(Path, "stat", lambda self: Mock(st_size=1024)):
                             # Should raise FatalError for verification failure
-                            try:
+                            with self.assert_raises(FatalError, "Should have raised FatalError for verification failure") as ei:
                                 manager.backup_full()
-                                assert False, "Should have raised FatalError for verification failure"
-                            except FatalError as e:
-                                assert "verification failed" in str(e).lower()
+                            assert "verification failed" in str(ei.value).lower()
 
     def test_backup_manager_backup_handles_cleanup_on_error(self):
         """Test backup cleans up temporary files and snapshots on error."""
-        import subprocess
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
+            manager = self.make_backup_manager(td)
+            _mkdirs(manager.target_dir)
 
             # Mock subprocess that fails
             mock_proc = Mock()
@@ -2214,21 +1802,15 @@ class TestSuite(TestBase):
                 return mock_proc
 
             # Mock ZFS methods
-            with self.patched(ZFS, "run", lambda *a, **kw: None):
+            with self.patched(ZFS, "run", _ok):
                 with self.patched(subprocess, "Popen", mock_popen):
                     with self.patched(Path, "stat", lambda self: Mock(st_size=1024)):
                         # Should raise FatalError and attempt cleanup
-                        try:
+                        with self.assert_raises(FatalError, "Should have raised FatalError"):
                             manager.backup_full()
-                            assert False, "Should have raised FatalError"
-                        except FatalError:
-                            pass
 
     def test_restore_manager_restore_success(self):
         """Test successful restore execution."""
-        import subprocess
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
             # Prepare fake backup chain
             args = Args(
@@ -2238,7 +1820,7 @@ class TestSuite(TestBase):
 
             # Create fake chain directory and backup file
             chain_dir = manager.target_dir / "chain-20240101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             backup_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
             self.write_file(backup_file, b"fake backup data")
 
@@ -2253,30 +1835,27 @@ class TestSuite(TestBase):
 
             # Mock ZFS methods
             with self.patched(ZFS, "is_dataset_exists", lambda ds: False):
-                with self.patched(ZFS, "run", lambda *a, **kw: None):
-                    with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+                with self.patched(ZFS, "run", _ok):
+                    with self.patched(ZFS, "verify_backup_file", _verified):
                         with self.patched(subprocess, "Popen", mock_popen):
                             # Should not raise exception
                             manager.restore()
 
     def test_restore_manager_restore_user_confirms_with_yes_proceeds(self):
         """Test restore when user types 'yes' to confirmation and restore proceeds."""
-        import builtins
-        import subprocess
-
         with self.tempdir() as td:
             args = Args(action="restore", dataset="rpool/test", mount_point=str(td), restore_pool="restored", restore_chain="chain-20250101", force=False)
             manager = RestoreManager(args, self.logger)
 
             # Create fake chain directory and backup file
             chain_dir = manager.target_dir / "chain-20250101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             backup_file = chain_dir / "TEST-full-20250101120000.zfs.gz"
             self.write_file(backup_file, b"fake backup data")
 
             # Mock input to return "yes"
             with self.patched(builtins, "input", lambda prompt: "yes"):
-                with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+                with self.patched(ZFS, "verify_backup_file", _verified):
                     with self.patched(ZFS, "is_dataset_exists", lambda ds: True):
                         # Mock ProcessPipeline to avoid actual subprocess calls
                         def mock_run_pipeline(self, commands):
@@ -2296,17 +1875,15 @@ class TestSuite(TestBase):
 
             # Create fake chain directory and backup file
             chain_dir = manager.target_dir / "chain-20240101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             backup_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
             self.write_file(backup_file, b"fake backup data")
 
             # Mock ZFS.verify_backup_file to return False
-            with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: False):
-                try:
+            with self.patched(ZFS, "verify_backup_file", _not_verified):
+                with self.assert_raises(FatalError, "Should have raised FatalError") as ei:
                     manager.restore()
-                    assert False, "Should have raised FatalError"
-                except FatalError as e:
-                    assert "verification failed" in str(e)
+                assert "verification failed" in str(ei.value)
 
     def test_restore_manager_restore_handles_no_backups(self):
         """Test restore handles empty backup chain."""
@@ -2316,13 +1893,11 @@ class TestSuite(TestBase):
 
             # Create empty chain directory
             chain_dir = manager.target_dir / "chain-20240101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
 
-            try:
+            with self.assert_raises(FatalError, "Should have raised FatalError") as ei:
                 manager.restore()
-                assert False, "Should have raised FatalError"
-            except FatalError as e:
-                assert "No backups found" in str(e)
+            assert "No backups found" in str(ei.value)
 
     def test_restore_manager_restore_handles_snapshot_filtering(self):
         """Test restore with snapshot filtering."""
@@ -2341,21 +1916,24 @@ class TestSuite(TestBase):
 
             # Create chain directory with multiple backup files
             chain_dir = manager.target_dir / "chain-20240101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
-            self.write_file(chain_dir / "TEST-full-20240101110000.zfs.gz", b"data1")
-            self.write_file(chain_dir / "TEST-diff-20240101120000.zfs.gz", b"data2")
-            self.write_file(chain_dir / "TEST-diff-20240101130000.zfs.gz", b"data3")
+            _mkdirs(chain_dir)
+            self.write_files(
+                chain_dir,
+                {
+                    "TEST-full-20240101110000.zfs.gz": b"data1",
+                    "TEST-diff-20240101120000.zfs.gz": b"data2",
+                    "TEST-diff-20240101130000.zfs.gz": b"data3",
+                },
+            )
 
             # Mock ZFS methods
-            with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+            with self.patched(ZFS, "verify_backup_file", _verified):
                 # Should filter to only files up to the specified snapshot
                 files = manager.chain.files(chain_dir)
                 assert len(files) >= 2  # Should include files up to 120000
 
     def test_restore_manager_restore_handles_user_confirmation_no(self):
         """Test restore handles user declining confirmation."""
-        import builtins
-
         with self.tempdir() as td:
             # Prepare fake backup chain
             args = Args(action="restore", dataset="rpool/test", mount_point=str(td), restore_pool="restored", restore_chain="chain-20240101", force=False)
@@ -2363,25 +1941,19 @@ class TestSuite(TestBase):
 
             # Create fake chain directory and backup file
             chain_dir = manager.target_dir / "chain-20240101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             backup_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
             self.write_file(backup_file, b"fake backup data")
 
             # Mock input to return "no"
             with self.patched(builtins, "input", lambda prompt: "no"):
-                with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+                with self.patched(ZFS, "verify_backup_file", _verified):
                     # Should exit without error when user says "no"
-                    try:
+                    with self.assert_raises(SystemExit, "Should have exited"):
                         manager.restore()
-                        assert False, "Should have exited"
-                    except SystemExit:
-                        pass
 
     def test_restore_manager_restore_handles_subprocess_failure(self):
         """Test restore handles subprocess failures."""
-        import subprocess
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
             # Prepare fake backup chain
             args = Args(action="restore", dataset="rpool/test", mount_point=str(td), restore_pool="restored", restore_chain="chain-20240101", force=True)
@@ -2389,7 +1961,7 @@ class TestSuite(TestBase):
 
             # Create fake chain directory and backup file
             chain_dir = manager.target_dir / "chain-20240101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             backup_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
             self.write_file(backup_file, b"fake backup data")
 
@@ -2404,19 +1976,15 @@ class TestSuite(TestBase):
 
             # Mock ZFS methods
             with self.patched(ZFS, "is_dataset_exists", lambda ds: False):
-                with self.patched(ZFS, "run", lambda *a, **kw: None):
-                    with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+                with self.patched(ZFS, "run", _ok):
+                    with self.patched(ZFS, "verify_backup_file", _verified):
                         with self.patched(subprocess, "Popen", mock_popen):
-                            try:
+                            with self.assert_raises(FatalError, "Should have raised FatalError") as ei:
                                 manager.restore()
-                                assert False, "Should have raised FatalError"
-                            except FatalError as e:
-                                assert "failed" in str(e)
+                            assert "failed" in str(ei.value)
 
     def test_main_handles_validation_error(self):
         """Test Main.run handles ValidationError exceptions."""
-        import sys
-
         with self.tempdir() as td:
             # Create args that will cause validation error
             args = Args(action="backup", dataset="nonexistent", mount_point=str(td))
@@ -2430,16 +1998,12 @@ class TestSuite(TestBase):
                 raise ValidationError("Test validation error")
 
             with self.patched(type(main_instance), "validate", failing_validate):
-                try:
+                with self.assert_raises(SystemExit, "Should have exited") as ei:
                     main_instance.run()
-                    assert False, "Should have exited"
-                except SystemExit as e:
-                    assert e.code == CONFIG.EXIT_INVALID_ARGS
+                assert ei.value.code == CONFIG.EXIT_INVALID_ARGS
 
     def test_main_handles_fatal_error(self):
         """Test Main.run handles FatalError exceptions."""
-        import sys
-
         with self.tempdir() as td:
             # Create valid args
             args = Args(action="backup", dataset="rpool/test", mount_point=str(td))
@@ -2456,16 +2020,11 @@ class TestSuite(TestBase):
                 # Manually test the backup action
                 manager = BackupManager(args, self.logger)
                 with self.patched(manager, "backup", failing_backup):
-                    try:
+                    with self.assert_raises(FatalError, "Should have raised FatalError"):
                         manager.backup()
-                        assert False, "Should have raised FatalError"
-                    except FatalError:
-                        pass
 
     def test_main_handles_unexpected_error(self):
         """Test Main.run handles unexpected exceptions."""
-        import sys
-
         with self.tempdir() as td:
             # Create valid args
             args = Args(action="backup", dataset="rpool/test", mount_point=str(td))
@@ -2479,17 +2038,12 @@ class TestSuite(TestBase):
                 raise ValueError("Unexpected error")
 
             with self.patched(type(main_instance), "validate", failing_validate):
-                try:
+                with self.assert_raises(SystemExit, "Should have exited") as ei:
                     main_instance.run()
-                    assert False, "Should have exited"
-                except SystemExit as e:
-                    assert e.code == CONFIG.EXIT_INVALID_ARGS
+                assert ei.value.code == CONFIG.EXIT_INVALID_ARGS
 
     def test_processpipeline_run_simple_captures_stderr_when_calledprocesserror(self):
         """Test ProcessPipeline.run_simple captures stderr when CalledProcessError has stderr."""
-        import subprocess
-        from unittest.mock import Mock
-
         pipeline = ProcessPipeline(self.logger)
 
         # Mock subprocess.run to raise CalledProcessError with stderr
@@ -2501,66 +2055,22 @@ class TestSuite(TestBase):
             raise subprocess.CalledProcessError(1, ["false"], stderr=b"some error output")
 
         with self.patched(subprocess, "run", mock_run):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError"):
                 pipeline.run_simple(["false"])
-                assert False, "Expected CalledProcessError"
-            except subprocess.CalledProcessError:
-                pass
 
     def test_processpipeline_run_pipeline_captures_stderr_from_failed_process(self):
         """Test run_pipeline captures stderr from failed intermediate process."""
-        import subprocess
-        import io
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
-        class MockProc:
-            def __init__(self, returncode=0, stdout=None, stderr=b"", communicate_ret=(b"", b"")):
-                self.returncode = returncode
-                self.stdout = stdout or io.BytesIO(b"")
-                self.stderr = io.BytesIO(stderr)  # Ensure stderr has data
-                self._communicate_ret = communicate_ret
-
-            def communicate(self, timeout=None):
-                return self._communicate_ret
-
-            def poll(self):
-                return self.returncode
-
-            def terminate(self):
-                pass
-
-            def wait(self, timeout=None):
-                return self.returncode
-
-            def kill(self):
-                pass
-
-        call = {"i": 0}
-
-        def fake_popen(cmd, stdin=None, stdout=None, stderr=None, **kw):
-            if call["i"] == 0:
-                p = MockProc(returncode=0, stdout=io.BytesIO(b"data"), communicate_ret=(b"", b""))
-            else:
-                # Failing process with stderr
-                p = MockProc(returncode=1, stdout=io.BytesIO(b""), stderr=b"intermediate error", communicate_ret=(b"", b"intermediate error"))
-            call["i"] += 1
-            return p
+        # First process succeeds; the second fails with stderr
+        fake_popen = _popen_sequence(_FakeProc(0, b"data"), _FakeProc(1, err=b"intermediate error"))
 
         with self.patched(subprocess, "Popen", fake_popen):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError"):
                 pipeline.run_pipeline([["echo"], ["false"]])
-                assert False, "Expected CalledProcessError"
-            except subprocess.CalledProcessError:
-                pass
 
     def test_lockfile_exit_handles_exceptions(self):
         """Test LockFile.__exit__ handles exceptions in fcntl.flock and os.close."""
-        import fcntl
-        import os
-
         with self.tempdir(prefix="lockfile-exit-") as td:
             p = Path(td) / "test.lock"
 
@@ -2578,28 +2088,52 @@ class TestSuite(TestBase):
                 lock.__exit__(None, None, None)
 
     def test_chainmanager_prune_old_handles_stat_exception(self):
-        """Test ChainManager.prune_old handles exceptions in tmp.stat()."""
-        from unittest.mock import Mock
-
+        """Test ChainManager.prune_old handles exceptions from the temp file's DirEntry.stat()."""
         tmp, c = self.make_chain_manager(prefix="prune-stat-")
         chain_dir = tmp / "chain-20250101"
-        chain_dir.mkdir(parents=True, exist_ok=True)
+        _mkdirs(chain_dir)
+        self.write_files(chain_dir, {"test.tmp": b"data"})
+        log = io.StringIO()
 
-        # Create a temp file
-        tmp_file = chain_dir / "test.tmp"
-        tmp_file.write_bytes(b"data")
+        class StatFailingEntry:
+            def __init__(self, entry):
+                self.name, self.path = entry.name, entry.path
 
-        # Mock Path.stat to raise exception
-        original_stat = Path.stat
+            def stat(self):
+                raise OSError("stat failed")
 
-        def failing_stat(self):
-            if self == tmp_file:
-                raise Exception("stat failed")
-            return original_stat(self)
+        real_scandir = os.scandir
 
-        with self.patched(Path, "stat", failing_stat):
+        # Yield test.tmp as an entry whose stat() raises; everything else is the real entry
+        def scandir(path="."):
+            with real_scandir(path) as it:
+                entries = [StatFailingEntry(e) if e.name == "test.tmp" else e for e in it]
+            return nullcontext(entries)
+
+        with self.patch_many({(os, "scandir"): scandir, (c.logger, "log_file"): log}):
             # Should not raise exception, just log error
             c.prune_old(10, dry_run=False)
+        assert f"Failed to remove temp file {chain_dir / 'test.tmp'}: stat failed" in log.getvalue()
+        self.assert_file_exists(chain_dir / "test.tmp")
+
+    def test_chainmanager_skips_unreadable_dirs(self):
+        """An unreadable chain dir is skipped by prune_old's temp sweep and read as empty by files()."""
+        tmp, c = self.make_chain_manager(prefix="prune-unreadable-")
+        chain_dir = tmp / "chain-20250101"
+        _mkdirs(chain_dir)
+        self.write_files(tmp, {"old.tmp": b"data"}, ages={"old.tmp": 7200})
+        real_scandir = os.scandir
+
+        def scandir(path="."):
+            if Path(path) == chain_dir:
+                raise PermissionError("permission denied")
+            return real_scandir(path)
+
+        with self.patched(os, "scandir", scandir):
+            c.prune_old(10, dry_run=False)
+            assert c.files(chain_dir) == []
+        # The sweep carried on past the unreadable chain dir
+        self.assert_file_not_exists(tmp / "old.tmp")
 
     def test_chainmanager_prune_old_skips_files_outside_backup_dir(self):
         """Test ChainManager.prune_old skips temp files outside backup directory."""
@@ -2607,7 +2141,7 @@ class TestSuite(TestBase):
 
         # Create temp file outside backup dir
         outside_tmp = tmp.parent / "outside.tmp"
-        outside_tmp.write_bytes(b"data")
+        self.write_file(outside_tmp, b"data")
 
         # Mock is_within_backup_dir to return False
         def mock_is_within(path):
@@ -2620,140 +2154,74 @@ class TestSuite(TestBase):
 
     def test_backup_differential_cleanup_on_verification_failure(self):
         """Test backup_differential cleanup when verification fails."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
             # Set up last_chain and full file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
             last_chain = "chain-20240101"
-            manager.last_chain_file.write_text(last_chain)
+            manager = self.make_backup_manager(td, chain=last_chain)
             chain_dir = manager.target_dir / last_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
             full_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
-            full_file.write_bytes(b"fake")
+            self.write_file(full_file, b"fake")
 
-            # Mock ZFS methods
-            with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
-                with self.patched(ZFS, "run", lambda *a, **kw: None):
-                    with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: False):
-                        # Mock ProcessPipeline to create tmpfile
-                        def mock_run_with_rate_limit(self, source_cmd, tmpfile, rate, compression_cmd):
-                            Path(tmpfile).write_bytes(b"data")
-
-                        with self.patched(ProcessPipeline, "run_with_rate_limit", mock_run_with_rate_limit):
-                            try:
-                                manager.backup_differential()
-                                assert False, "Expected FatalError"
-                            except FatalError:
-                                # Ensure tmpfile was cleaned up
-                                tmp_files = list(chain_dir.glob("*.tmp"))
-                                assert not tmp_files, f"Found leftover tmp files: {tmp_files}"
+            with self.mock_backup_env(verify=_not_verified, snapshot_exists=True):
+                with self.assert_raises(FatalError, "Expected FatalError"):
+                    manager.backup_differential()
+                # Ensure tmpfile was cleaned up
+                self.assert_no_tmp_files(chain_dir)
 
     def test_backup_differential_empty_backup_file_raises(self):
         """Test backup_differential raises FatalError when backup file is empty."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
             # Set up last_chain and full file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
             last_chain = "chain-20240101"
-            manager.last_chain_file.write_text(last_chain)
+            manager = self.make_backup_manager(td, chain=last_chain)
             chain_dir = manager.target_dir / last_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
             full_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
-            full_file.write_bytes(b"fake")
+            self.write_file(full_file, b"fake")
 
-            # Mock ZFS methods
-            with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
-                with self.patched(ZFS, "run", lambda *a, **kw: None):
-                    with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
-                        # Mock ProcessPipeline to create an empty tmpfile
-                        def mock_run_with_rate_limit(self, source_cmd, tmpfile, rate, compression_cmd):
-                            Path(tmpfile).write_bytes(b"")  # Empty file
-
-                        with self.patched(ProcessPipeline, "run_with_rate_limit", mock_run_with_rate_limit):
-                            try:
-                                manager.backup_differential()
-                                assert False, "Expected FatalError for empty backup file"
-                            except FatalError as e:
-                                assert "empty" in str(e).lower()
+            # The pipeline creates an empty tmpfile
+            with self.mock_backup_env(b"", snapshot_exists=True):
+                with self.assert_raises(FatalError, "Expected FatalError for empty backup file") as ei:
+                    manager.backup_differential()
+                assert "empty" in str(ei.value).lower()
 
     def test_backup_differential_success_path(self):
         """Test successful differential backup execution."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
             # Set up last_chain and full file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
             last_chain = "chain-20240101"
-            manager.last_chain_file.write_text(last_chain)
+            manager = self.make_backup_manager(td, chain=last_chain)
             chain_dir = manager.target_dir / last_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
             full_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
-            full_file.write_bytes(b"fake")
-
-            # Mock ZFS methods
-            with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
-                with self.patched(ZFS, "run", lambda *a, **kw: None):
-                    with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
-                        # Mock ProcessPipeline to create a tmpfile
-                        def mock_run_with_rate_limit(self, source_cmd, tmpfile, rate, compression_cmd):
-                            Path(tmpfile).write_bytes(b"valid data")
+            self.write_file(full_file, b"fake")
 
-                        with self.patched(ProcessPipeline, "run_with_rate_limit", mock_run_with_rate_limit):
-                            manager.backup_differential()
+            with self.mock_backup_env(b"valid data", snapshot_exists=True):
+                manager.backup_differential()
 
-                            # Check that final file was created
-                            diff_files = list(chain_dir.glob("TEST-diff-*.zfs.gz"))
-                            assert diff_files, "Expected differential backup file to be created"
+            # Check that final file was created
+            diff_files = list(chain_dir.glob("TEST-diff-*.zfs.gz"))
+            assert diff_files, "Expected differential backup file to be created"
 
     def test_backup_differential_cleanup_snapshot_destroy_failure_logs_error(self):
         """Test backup_differential logs error when snapshot destroy fails during cleanup."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
             # Set up last_chain and full file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
             last_chain = "chain-20240101"
-            manager.last_chain_file.write_text(last_chain)
+            manager = self.make_backup_manager(td, chain=last_chain)
             chain_dir = manager.target_dir / last_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
             full_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
-            full_file.write_bytes(b"fake")
+            self.write_file(full_file, b"fake")
 
             # Mock ZFS methods - make destroy fail
             def mock_zfs_run(cmd, logger, dry_run=False):
-                cmd_str = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
+                cmd_str = _cmd_str(cmd)
                 if "destroy" in cmd_str:
                     raise Exception("destroy failed")
                 return None
 
-            with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
-                with self.patched(ZFS, "run", mock_zfs_run):
-                    with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: False):
-                        # Mock ProcessPipeline to create a tmpfile
-                        def mock_run_with_rate_limit(self, source_cmd, tmpfile, rate, compression_cmd):
-                            Path(tmpfile).write_bytes(b"data")
-
-                        with self.patched(ProcessPipeline, "run_with_rate_limit", mock_run_with_rate_limit):
-                            try:
-                                manager.backup_differential()
-                                assert False, "Expected FatalError"
-                            except FatalError:
-                                # Should still raise even if destroy fails
-                                pass
+            with self.mock_backup_env(zfs_run=mock_zfs_run, verify=_not_verified, snapshot_exists=True):
+                # Should still raise even if destroy fails
+                with self.assert_raises(FatalError, "Expected FatalError"):
+                    manager.backup_differential()
 
     def test_restore_manager_restore_snapshot_filtering_with_digits(self):
         """Test restore with snapshot filtering using digit matching."""
@@ -2771,40 +2239,41 @@ class TestSuite(TestBase):
 
             # Create chain directory with multiple backup files
             chain_dir = manager.target_dir / "chain-20250101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
-            self.write_file(chain_dir / "TEST-full-20250101110000.zfs.gz", b"data1")
-            self.write_file(chain_dir / "TEST-diff-20250101120000.zfs.gz", b"data2")
-            self.write_file(chain_dir / "TEST-diff-20250101130000.zfs.gz", b"data3")
+            _mkdirs(chain_dir)
+            self.write_files(
+                chain_dir,
+                {
+                    "TEST-full-20250101110000.zfs.gz": b"data1",
+                    "TEST-diff-20250101120000.zfs.gz": b"data2",
+                    "TEST-diff-20250101130000.zfs.gz": b"data3",
+                },
+            )
 
             # Mock ZFS methods
-            with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+            with self.patched(ZFS, "verify_backup_file", _verified):
                 # Should filter to include files with '120000' in name
                 files = manager.chain.files(chain_dir)
                 assert len(files) >= 2  # Should include files up to 120000
 
     def test_restore_manager_restore_user_aborts_with_no(self):
         """Test restore when user types 'no' to confirmation."""
-        import builtins
-
         with self.tempdir() as td:
             args = Args(action="restore", dataset="rpool/test", mount_point=str(td), restore_pool="restored", restore_chain="chain-20250101", force=False)
             manager = RestoreManager(args, self.logger)
 
             # Create fake chain directory and backup file
             chain_dir = manager.target_dir / "chain-20250101"
-            chain_dir.mkdir(parents=True, exist_ok=True)
+            _mkdirs(chain_dir)
             backup_file = chain_dir / "TEST-full-20250101120000.zfs.gz"
             self.write_file(backup_file, b"fake backup data")
 
             # Mock input to return "no"
             with self.patched(builtins, "input", lambda prompt: "no"):
-                with self.patched(ZFS, "verify_backup_file", lambda *a, **kw: True):
+                with self.patched(ZFS, "verify_backup_file", _verified):
                     # Should exit with success
-                    try:
+                    with self.assert_raises(SystemExit, "Should have exited") as ei:
                         manager.restore()
-                        assert False, "Should have exited"
-                    except SystemExit as e:
-                        assert e.code == CONFIG.EXIT_SUCCESS
+                    assert ei.value.code == CONFIG.EXIT_SUCCESS
 
     def test_main_validate_mount_point_not_directory(self):
         """Test Main.validate raises ValidationError for non-directory mount point."""
@@ -2821,16 +2290,11 @@ class TestSuite(TestBase):
             with self.patched(os, "geteuid", lambda: 0):
                 with self.patched(ZFS, "is_dataset_exists", lambda ds: True):
                     with self.patched(Cmd, "has_required_binaries", lambda logger, rate=None: True):
-                        try:
+                        with self.assert_raises(ValidationError, "Should have raised ValidationError"):
                             main.validate()
-                            assert False, "Should have raised ValidationError"
-                        except ValidationError:
-                            pass
 
     def test_main_run_catches_unexpected_exception(self):
         """Test Main.run catches unexpected exceptions and exits."""
-        import sys
-
         with self.tempdir() as td:
             args = Args(action="backup", dataset="rpool/test", mount_point=str(td))
 
@@ -2857,34 +2321,22 @@ class TestSuite(TestBase):
                             raise ValueError("Unexpected error")
                         except Exception as e:
                             main_instance.logger.error(f"Unexpected error: {e}")
-                            # This should call sys.exit
-                            with self.patched(sys, "exit", lambda code: (_ for _ in ()).throw(SystemExit(code))):
-                                try:
-                                    sys.exit(CONFIG.EXIT_INVALID_ARGS)
-                                    assert False, "Should have raised SystemExit"
-                                except SystemExit as e:
-                                    assert e.code == CONFIG.EXIT_INVALID_ARGS
+                            # This should call sys.exit, which raises SystemExit(code)
+                            with self.assert_raises(SystemExit, "Should have raised SystemExit") as ei:
+                                sys.exit(CONFIG.EXIT_INVALID_ARGS)
+                            assert ei.value.code == CONFIG.EXIT_INVALID_ARGS
 
     def test_backup_full_cleanup_removes_tmpfile_and_logs_successful_snapshot_cleanup(self):
         """Test backup_full cleanup removes tmpfile and logs successful snapshot cleanup."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            # Patch ProcessPipeline.run_with_rate_limit to write a tmpfile then raise
-            def fake_run_with_rate_limit(source_cmd, tmpfile, rate, compression_cmd):
-                # Create the tmpfile to simulate a partially-written file
-                Path(tmpfile).write_bytes(b"partial data")
-                raise Exception("pipeline failure")
+            manager = self.make_backup_manager(td)
 
             # Patch ZFS.run so snapshot creation succeeds and destroy succeeds
             destroy_called = False
 
             def fake_zfs_run(cmd, logger, dry_run=False):
                 nonlocal destroy_called
-                cmd_str = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
+                cmd_str = _cmd_str(cmd)
                 if "snapshot" in cmd_str:
                     return None
                 if "destroy" in cmd_str:
@@ -2892,47 +2344,30 @@ class TestSuite(TestBase):
                     return None
                 return None
 
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run):
-                    try:
-                        manager.backup_full()
-                        assert False, "Expected FatalError from backup_full"
-                    except FatalError:
-                        # Verify tmpfile was cleaned up
-                        tmp_files = list(manager.target_dir.rglob("*.tmp"))
-                        assert not tmp_files, f"Found leftover tmp files: {tmp_files}"
-                        # Verify destroy was called
-                        assert destroy_called, "Expected snapshot destroy to be called"
+            with self.mock_backup_env(b"partial data", Exception("pipeline failure"), zfs_run=fake_zfs_run):
+                with self.assert_raises(FatalError, "Expected FatalError from backup_full"):
+                    manager.backup_full()
+                # Verify tmpfile was cleaned up
+                self.assert_no_tmp_files(manager.target_dir)
+                # Verify destroy was called
+                assert destroy_called, "Expected snapshot destroy to be called"
 
     def test_backup_differential_cleanup_removes_tmpfile_and_logs_successful_snapshot_cleanup(self):
         """Test backup_differential cleanup removes tmpfile and logs successful snapshot cleanup."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
             # Set up last_chain and full file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
             last_chain = "chain-20240101"
-            manager.last_chain_file.write_text(last_chain)
+            manager = self.make_backup_manager(td, chain=last_chain)
             chain_dir = manager.target_dir / last_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
             full_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
-            full_file.write_bytes(b"fake backup data")
-
-            # Patch ProcessPipeline.run_with_rate_limit to write a tmpfile then raise
-            def fake_run_with_rate_limit(source_cmd, tmpfile, rate, compression_cmd):
-                # Create the tmpfile to simulate a partially-written file
-                Path(tmpfile).write_bytes(b"partial differential data")
-                raise Exception("pipeline failure")
+            self.write_file(full_file, b"fake backup data")
 
             # Patch ZFS.run so snapshot creation succeeds and destroy succeeds
             destroy_called = False
 
             def fake_zfs_run(cmd, logger, dry_run=False):
                 nonlocal destroy_called
-                cmd_str = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
+                cmd_str = _cmd_str(cmd)
                 if "snapshot" in cmd_str:
                     return None
                 if "destroy" in cmd_str:
@@ -2940,130 +2375,61 @@ class TestSuite(TestBase):
                     return None
                 return None
 
-            with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
-                with self.patched(ZFS, "run", fake_zfs_run):
-                    with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                        try:
-                            manager.backup_differential()
-                            assert False, "Expected FatalError from backup_differential"
-                        except FatalError:
-                            # Verify tmpfile was cleaned up
-                            tmp_files = list(chain_dir.glob("*.tmp"))
-                            assert not tmp_files, f"Found leftover tmp files: {tmp_files}"
-                            # Verify destroy was called
-                            assert destroy_called, "Expected snapshot destroy to be called"
+            with self.mock_backup_env(b"partial differential data", Exception("pipeline failure"), zfs_run=fake_zfs_run, snapshot_exists=True):
+                with self.assert_raises(FatalError, "Expected FatalError from backup_differential"):
+                    manager.backup_differential()
+                # Verify tmpfile was cleaned up
+                self.assert_no_tmp_files(chain_dir)
+                # Verify destroy was called
+                assert destroy_called, "Expected snapshot destroy to be called"
 
     def test_processpipeline_run_pipeline_stderr_read_exception_handled(self):
         """Test ProcessPipeline.run_pipeline handles stderr.read() exceptions gracefully."""
-        import subprocess
-        import io
-        from unittest.mock import Mock
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
-        class MockProcWithBrokenStderr:
-            def __init__(self):
-                self.returncode = 1
-                self.stdout = io.BytesIO(b"")
-                self.stderr = Mock()
-                # Make stderr.read() raise an exception
-                self.stderr.read.side_effect = Exception("read failed")
-
-            def communicate(self, timeout=None):
-                return (b"", b"")
-
-            def poll(self):
-                return self.returncode
-
-            def terminate(self):
-                pass
-
-            def wait(self, timeout=None):
-                return self.returncode
-
-            def kill(self):
-                pass
+        proc = _FakeProc(1)
+        # Make stderr.read() raise an exception
+        proc.stderr = Mock()
+        proc.stderr.read.side_effect = Exception("read failed")
 
-        def fake_popen(cmd, **kwargs):
-            return MockProcWithBrokenStderr()
+        fake_popen = _popen_sequence(proc)
 
         with self.patched(subprocess, "Popen", fake_popen):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError") as ei:
                 pipeline.run_pipeline([["false"]])
-                assert False, "Expected CalledProcessError"
-            except subprocess.CalledProcessError as e:
-                # Should still raise CalledProcessError but without stderr in the message
-                # The exception handling should gracefully handle the stderr.read() failure
-                assert e.returncode == 1
-                assert e.cmd == "false"
-                assert e.stderr is None
-            except Exception as e:
-                # If we get a different exception, that's also fine as long as stderr.read() exception was handled
-                pass
+            # Should still raise CalledProcessError but without stderr in the message
+            # The exception handling should gracefully handle the stderr.read() failure
+            assert ei.value.returncode == 1
+            assert ei.value.cmd == "false"
+            assert ei.value.stderr is None
 
     def test_processpipeline_run_pipeline_handles_proc_stderr_none(self):
         """Test ProcessPipeline.run_pipeline handles proc.stderr = None gracefully."""
-        import subprocess
-        import io
-
-        from zfs_simple_backup_restore import ProcessPipeline
-
         pipeline = ProcessPipeline(self.logger)
 
-        class MockProcStderrNone:
-            def __init__(self):
-                self.returncode = 1
-                self.stdout = io.BytesIO(b"")
-                self.stderr = None  # Simulate stderr not captured
-
-            def communicate(self, timeout=None):
-                return (b"", b"")
-
-            def poll(self):
-                return self.returncode
-
-            def terminate(self):
-                pass
-
-            def wait(self, timeout=None):
-                return self.returncode
-
-            def kill(self):
-                pass
+        proc = _FakeProc(1)
+        proc.stderr = None  # Simulate stderr not captured
 
-        def fake_popen(cmd, **kwargs):
-            return MockProcStderrNone()
+        fake_popen = _popen_sequence(proc)
 
         with self.patched(subprocess, "Popen", fake_popen):
-            try:
+            with self.assert_raises(subprocess.CalledProcessError, "Expected CalledProcessError") as ei:
                 pipeline.run_pipeline([["false"]])
-                assert False, "Expected CalledProcessError"
-            except subprocess.CalledProcessError as e:
-                assert e.returncode == 1
-                assert e.cmd == "false"
-                assert e.stderr is None
+            assert ei.value.returncode == 1
+            assert ei.value.cmd == "false"
+            assert ei.value.stderr is None
 
     def test_backup_full_cleanup_skips_tmpfile_removal_when_file_missing(self):
         """Test backup_full cleanup when tmpfile doesn't exist (covers line 683 condition being False)."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            # Patch ProcessPipeline.run_with_rate_limit to raise without creating tmpfile
-            def fake_run_with_rate_limit(source_cmd, tmpfile, rate, compression_cmd):
-                # Don't create the tmpfile - simulate a case where it doesn't exist
-                raise Exception("pipeline failure")
+            manager = self.make_backup_manager(td)
 
             # Patch ZFS.run so snapshot creation succeeds and destroy succeeds
             destroy_called = False
 
             def fake_zfs_run(cmd, logger, dry_run=False):
                 nonlocal destroy_called
-                cmd_str = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
+                cmd_str = _cmd_str(cmd)
                 if "snapshot" in cmd_str:
                     return None
                 if "destroy" in cmd_str:
@@ -3071,76 +2437,48 @@ class TestSuite(TestBase):
                     return None
                 return None
 
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run):
-                    try:
-                        manager.backup_full()
-                        assert False, "Expected FatalError from backup_full"
-                    except FatalError:
-                        # Verify destroy was called (snapshot cleanup should still happen)
-                        assert destroy_called, "Expected snapshot destroy to be called"
-                        # The tmpfile removal code should be skipped since file doesn't exist
+            with self.mock_backup_env(None, Exception("pipeline failure"), zfs_run=fake_zfs_run):
+                with self.assert_raises(FatalError, "Expected FatalError from backup_full"):
+                    manager.backup_full()
+                # Verify destroy was called (snapshot cleanup should still happen)
+                assert destroy_called, "Expected snapshot destroy to be called"
+                # The tmpfile removal code should be skipped since file doesn't exist
 
     def test_backup_full_cleanup_skips_snapshot_cleanup_when_snapshot_not_created(self):
         """Test backup_full cleanup when snapshot_created is False (covers line 687 condition being False)."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
-            # Patch ProcessPipeline.run_with_rate_limit to write a tmpfile then raise
-            def fake_run_with_rate_limit(source_cmd, tmpfile, rate, compression_cmd):
-                # Create the tmpfile to simulate a partially-written file
-                Path(tmpfile).write_bytes(b"partial data")
-                raise Exception("pipeline failure")
+            manager = self.make_backup_manager(td)
 
             # Patch ZFS.run to fail on snapshot creation (so snapshot_created remains False)
             def fake_zfs_run(cmd, logger, dry_run=False):
-                cmd_str = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
+                cmd_str = _cmd_str(cmd)
                 if "snapshot" in cmd_str:
                     raise Exception("snapshot creation failed")
                 return None
 
-            with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                with self.patched(ZFS, "run", fake_zfs_run):
-                    try:
-                        manager.backup_full()
-                        assert False, "Expected FatalError from backup_full"
-                    except FatalError:
-                        # Verify tmpfile was cleaned up
-                        tmp_files = list(manager.target_dir.rglob("*.tmp"))
-                        assert not tmp_files, f"Found leftover tmp files: {tmp_files}"
-                        # The snapshot cleanup code should be skipped since snapshot_created is False
+            with self.mock_backup_env(b"partial data", Exception("pipeline failure"), zfs_run=fake_zfs_run):
+                with self.assert_raises(FatalError, "Expected FatalError from backup_full"):
+                    manager.backup_full()
+                # Verify tmpfile was cleaned up
+                self.assert_no_tmp_files(manager.target_dir)
+                # The snapshot cleanup code should be skipped since snapshot_created is False
 
     def test_backup_differential_cleanup_skips_tmpfile_removal_when_file_missing(self):
         """Test backup_differential cleanup when tmpfile doesn't exist (covers line 751 condition being False)."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
             # Set up last_chain and full file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
             last_chain = "chain-20240101"
-            manager.last_chain_file.write_text(last_chain)
+            manager = self.make_backup_manager(td, chain=last_chain)
             chain_dir = manager.target_dir / last_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
             full_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
-            full_file.write_bytes(b"fake backup data")
-
-            # Patch ProcessPipeline.run_with_rate_limit to raise without creating tmpfile
-            def fake_run_with_rate_limit(source_cmd, tmpfile, rate, compression_cmd):
-                # Don't create the tmpfile - simulate a case where it doesn't exist
-                raise Exception("pipeline failure")
+            self.write_file(full_file, b"fake backup data")
 
             # Patch ZFS.run so snapshot creation succeeds and destroy succeeds
             destroy_called = False
 
             def fake_zfs_run(cmd, logger, dry_run=False):
                 nonlocal destroy_called
-                cmd_str = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
+                cmd_str = _cmd_str(cmd)
                 if "snapshot" in cmd_str:
                     return None
                 if "destroy" in cmd_str:
@@ -3148,58 +2486,36 @@ class TestSuite(TestBase):
                     return None
                 return None
 
-            with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
-                with self.patched(ZFS, "run", fake_zfs_run):
-                    with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                        try:
-                            manager.backup_differential()
-                            assert False, "Expected FatalError from backup_differential"
-                        except FatalError:
-                            # Verify destroy was called (snapshot cleanup should still happen)
-                            assert destroy_called, "Expected snapshot destroy to be called"
-                            # The tmpfile removal code should be skipped since file doesn't exist
+            with self.mock_backup_env(None, Exception("pipeline failure"), zfs_run=fake_zfs_run, snapshot_exists=True):
+                with self.assert_raises(FatalError, "Expected FatalError from backup_differential"):
+                    manager.backup_differential()
+                # Verify destroy was called (snapshot cleanup should still happen)
+                assert destroy_called, "Expected snapshot destroy to be called"
+                # The tmpfile removal code should be skipped since file doesn't exist
 
     def test_backup_differential_cleanup_skips_snapshot_cleanup_when_snapshot_not_created(self):
         """Test backup_differential cleanup when snapshot_created is False (covers line 755 condition being False)."""
-        from unittest.mock import Mock
-
         with self.tempdir() as td:
-            args = Args(action="backup", dataset="rpool/test", mount_point=str(td), prefix="TEST", dry_run=False)
-            manager = BackupManager(args, self.logger)
-
             # Set up last_chain and full file
-            manager.target_dir.mkdir(parents=True, exist_ok=True)
             last_chain = "chain-20240101"
-            manager.last_chain_file.write_text(last_chain)
+            manager = self.make_backup_manager(td, chain=last_chain)
             chain_dir = manager.target_dir / last_chain
-            chain_dir.mkdir(parents=True, exist_ok=True)
             full_file = chain_dir / "TEST-full-20240101120000.zfs.gz"
-            full_file.write_bytes(b"fake backup data")
-
-            # Patch ProcessPipeline.run_with_rate_limit to write a tmpfile then raise
-            def fake_run_with_rate_limit(source_cmd, tmpfile, rate, compression_cmd):
-                # Create the tmpfile to simulate a partially-written file
-                Path(tmpfile).write_bytes(b"partial differential data")
-                raise Exception("pipeline failure")
+            self.write_file(full_file, b"fake backup data")
 
             # Patch ZFS.run to fail on snapshot creation (so snapshot_created remains False)
             def fake_zfs_run(cmd, logger, dry_run=False):
-                cmd_str = " ".join(cmd) if isinstance(cmd, (list, tuple)) else str(cmd)
+                cmd_str = _cmd_str(cmd)
                 if "snapshot" in cmd_str:
                     raise Exception("snapshot creation failed")
                 return None
 
-            with self.patched(ZFS, "is_snapshot_exists", lambda ds, snap: True):
-                with self.patched(ZFS, "run", fake_zfs_run):
-                    with self.patched(ProcessPipeline, "run_with_rate_limit", fake_run_with_rate_limit):
-                        try:
-                            manager.backup_differential()
-                            assert False, "Expected FatalError from backup_differential"
-                        except FatalError:
-                            # Verify tmpfile was cleaned up
-                            tmp_files = list(chain_dir.glob("*.tmp"))
-                            assert not tmp_files, f"Found leftover tmp files: {tmp_files}"
-                            # The snapshot cleanup code should be skipped since snapshot_created is False
+            with self.mock_backup_env(b"partial differential data", Exception("pipeline failure"), zfs_run=fake_zfs_run, snapshot_exists=True):
+                with self.assert_raises(FatalError, "Expected FatalError from backup_differential"):
+                    manager.backup_differential()
+                # Verify tmpfile was cleaned up
+                self.assert_no_tmp_files(chain_dir)
+                # The snapshot cleanup code should be skipped since snapshot_created is False
 
 
 if __name__ == "__main__":
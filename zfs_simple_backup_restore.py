@@ -8,6 +8,7 @@ import shutil
 import os
 import subprocess
 import fcntl
+import re
 import time
 from datetime import datetime
 
@@ -56,6 +57,8 @@ class CONFIG:
 class Logger:
     def __init__(self, verbose: bool = False):
         self.verbose = verbose
+        # Console sink; None means whatever sys.stderr is at the time of the call
+        self.stream = None
         self.log_file_path = f"{CONFIG.get_log_dir()}/{CONFIG.SCRIPT_ID}.log"
         try:
             os.makedirs(os.path.dirname(self.log_file_path), exist_ok=True)
@@ -82,19 +85,19 @@ class Logger:
 
     def info(self, msg: str) -> None:
         if self.verbose:
-            print(f"[INFO]  {msg}", file=sys.stderr)
+            print(f"[INFO]  {msg}", file=self.stream or sys.stderr)
         self._write_logfile("INFO", msg)
         if self.journal_available:
             self.journal.send(msg, SYSLOG_IDENTIFIER=CONFIG.SCRIPT_ID, PRIORITY=self.journal.LOG_INFO)
 
     def always(self, msg: str) -> None:
-        print(f"[INFO]  {msg}", file=sys.stderr)
+        print(f"[INFO]  {msg}", file=self.stream or sys.stderr)
         self._write_logfile("INFO", msg)
         if self.journal_available:
             self.journal.send(msg, SYSLOG_IDENTIFIER=CONFIG.SCRIPT_ID, PRIORITY=self.journal.LOG_INFO)
 
     def error(self, msg: str) -> None:
-        print(f"[ERROR] {msg}", file=sys.stderr)
+        print(f"[ERROR] {msg}", file=self.stream or sys.stderr)
         self._write_logfile("ERROR", msg)
         if self.journal_available:
             self.journal.send(msg, SYSLOG_IDENTIFIER=CONFIG.SCRIPT_ID, PRIORITY=self.journal.LOG_ERR)
@@ -102,12 +105,30 @@ class Logger:
 
 # ========== Cmd Class ==========
 class Cmd:
+    # Resolved binary paths (or None when missing), memoized for the life of the process
+    _which_cache: dict[str, str | None] = {}
+    # pigz path -> whether `pigz --version` succeeded
+    _pigz_works: dict[str, bool] = {}
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Forget memoized binary lookups and probes (e.g. after PATH changes)."""
+        Cmd._which_cache.clear()
+        Cmd._pigz_works.clear()
+
     @staticmethod
     def _which(name: str) -> str | None:
         """Find executable in PATH or common sbin locations.
 
         This helps when cron provides a limited PATH that doesn't include /sbin or /usr/sbin.
+        Lookups are cached; call Cmd.clear_cache() if PATH changes.
         """
+        if name not in Cmd._which_cache:
+            Cmd._which_cache[name] = Cmd._find_binary(name)
+        return Cmd._which_cache[name]
+
+    @staticmethod
+    def _find_binary(name: str) -> str | None:
         p = shutil.which(name)
         if p:
             return p
@@ -131,15 +152,22 @@ class Cmd:
         return [Cmd._which("pv") or "pv", "-q", "-L", rate] if rate else []
 
     @staticmethod
-    def gzip(*args):
+    def gzip(*args, runner=None):
+        """Return a gzip command, preferring pigz when it is installed and runs.
+
+        `runner` stands in for subprocess.run for the pigz probe.
+        """
         pigz_path = Cmd._which("pigz")
-        # Check if pigz actually exists and works
+        # Check if pigz actually exists and works (once per path)
         if pigz_path:
-            try:
-                subprocess.run([pigz_path, "--version"], capture_output=True, timeout=5, check=True)
+            if pigz_path not in Cmd._pigz_works:
+                try:
+                    (runner or subprocess.run)([pigz_path, "--version"], capture_output=True, timeout=5, check=True)
+                    Cmd._pigz_works[pigz_path] = True
+                except Exception:
+                    Cmd._pigz_works[pigz_path] = False
+            if Cmd._pigz_works[pigz_path]:
                 return [pigz_path] + list(args)
-            except Exception:
-                pass
         return [Cmd._which("gzip") or "gzip"] + list(args)
 
     @staticmethod
@@ -154,12 +182,13 @@ class Cmd:
     def head(*args):
         return [Cmd._which("head") or "head"] + list(args)
 
+    # Binaries every run needs; pv is added only when a rate limit is set
+    _REQUIRED_BINARIES = frozenset({"zfs", "zpool", "gzip", "zstreamdump", "head"})
+    _REQUIRED_BINARIES_RATE = _REQUIRED_BINARIES | {"pv"}
+
     @staticmethod
     def required_binaries(rate=None):
-        bins = {"zfs", "zpool", "gzip", "zstreamdump", "head"}
-        if rate:
-            bins.add("pv")
-        return bins
+        return Cmd._REQUIRED_BINARIES_RATE if rate else Cmd._REQUIRED_BINARIES
 
     @staticmethod
     def has_required_binaries(logger, rate=None):
@@ -347,6 +376,8 @@ class LockFile:
         try:
             fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
         except Exception:
+            os.close(self.fd)
+            self.fd = None
             self.logger.error(f"Lock held: {self.path}")
             raise FatalError(f"Lock held: {self.path}")
         return self
@@ -365,6 +396,9 @@ class LockFile:
 
 # ========== ChainManager ==========
 class ChainManager:
+    # Chain folders are named chain-YYYYMMDD (see today())
+    NAME_RE = re.compile(r"chain-\d{8}")
+
     def __init__(self, target_dir: Path, prefix: str, logger: Logger):
         self.target_dir = target_dir
         self.prefix = prefix
@@ -373,8 +407,15 @@ class ChainManager:
     def today(self) -> str:
         return f"chain-{datetime.now().strftime('%Y%m%d')}"
 
+    @staticmethod
+    def is_chain_name(name: str) -> bool:
+        return ChainManager.NAME_RE.fullmatch(name) is not None
+
+    def _chain_dirs(self) -> list:
+        return sorted(p for p in self.target_dir.glob("chain-*") if self.is_chain_name(p.name))
+
     def prune_old(self, retention_chains: int, dry_run: bool = False) -> None:
-        chains = sorted(self.target_dir.glob("chain-*"))
+        chains = self._chain_dirs()
         if len(chains) > retention_chains:
             to_delete = chains[: len(chains) - retention_chains]
             for d in to_delete:
@@ -383,21 +424,28 @@ class ChainManager:
                     if not dry_run:
                         shutil.rmtree(d, ignore_errors=True)
         now_ts = time.time()
-        dirs_to_clean = [self.target_dir] + list(self.target_dir.glob("chain-*"))
+        dirs_to_clean = [self.target_dir] + self._chain_dirs()
         for d in dirs_to_clean:
-            for tmp in Path(d).glob("*.tmp"):
+            try:
+                with os.scandir(d) as it:
+                    entries = [e for e in it if e.name.endswith(".tmp")]
+            except OSError:
+                # Missing or unreadable directory: nothing we can clean there
+                continue
+            for entry in entries:
+                tmp = Path(entry.path)
                 try:
                     if not self.is_within_backup_dir(tmp):
                         continue
-                    age = now_ts - tmp.stat().st_mtime
+                    age = now_ts - entry.stat().st_mtime
                     if age > 3600:
-                        tmp.unlink()
+                        os.unlink(entry.path)
                         self.logger.always(f"Removed orphaned temp file: {tmp}")
                 except Exception as e:
                     self.logger.error(f"Failed to remove temp file {tmp}: {e}")
 
     def latest_chain_dir(self) -> Path:
-        chain_dirs = sorted(self.target_dir.glob("chain-*"))
+        chain_dirs = self._chain_dirs()
         if not chain_dirs:
             self.logger.error("No chain folders found")
             raise FatalError("No chain folders found")
@@ -426,7 +474,12 @@ class ChainManager:
                 ts = name.split("-diff-")[-1].split(".zfs")[0].replace(".gz", "")
             return (kind, ts, name)
 
-        files = [f for f in chain_dir.glob("*.zfs.gz") if not str(f).endswith(".tmp") and f.stat().st_size > 0]
+        # One directory read; DirEntry caches file type and stat, so no per-file Path.stat()
+        try:
+            with os.scandir(chain_dir) as it:
+                files = [Path(e.path) for e in it if e.name.endswith(".zfs.gz") and e.is_file() and e.stat().st_size > 0]
+        except OSError:
+            return []
         return sorted(files, key=parse_key)
 
     def is_within_backup_dir(self, path: Path) -> bool:
@@ -437,51 +490,74 @@ class ChainManager:
 
 # ========== ZFS ==========
 class ZFS:
+    # Commands default to close_fds=False to skip the child-side close sweep. fds Python opens
+    # are non-inheritable (PEP 446), but fds inherited from our own parent (cron, systemd) are
+    # passed on to zfs/zpool; callers of run() can pass close_fds=True to close them.
     @staticmethod
-    def is_dataset_exists(dataset: str) -> bool:
+    def is_dataset_exists(dataset: str, runner=None) -> bool:
         try:
-            subprocess.run(
+            (runner or subprocess.run)(
                 Cmd.zfs("list", dataset),
                 check=True,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
+                close_fds=False,
             )
             return True
         except subprocess.CalledProcessError:
             return False
 
     @staticmethod
-    def is_pool_exists(pool: str) -> bool:
+    def is_pool_exists(pool: str, runner=None) -> bool:
         try:
-            subprocess.run(
+            (runner or subprocess.run)(
                 Cmd.zpool("list", pool),
                 check=True,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
+                close_fds=False,
             )
             return True
         except subprocess.CalledProcessError:
             return False
 
     @staticmethod
-    def is_snapshot_exists(dataset: str, snapshot_name: str) -> bool:
+    def is_snapshot_exists(dataset: str, snapshot_name: str, runner=None) -> bool:
         try:
             full_name = f"{dataset}@{snapshot_name}"
-            subprocess.run(
+            (runner or subprocess.run)(
                 Cmd.zfs("list", "-t", "snapshot", full_name),
                 check=True,
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
+                close_fds=False,
             )
             return True
         except subprocess.CalledProcessError:
             return False
 
     @staticmethod
-    def run(cmd: list, logger: Logger, dry_run: bool = False, **kwargs) -> None:
+    def get_props(dataset: str, props: list[str], runner=None) -> dict[str, str]:
+        """Fetch several properties of a dataset with a single `zfs get` call."""
+        result = (runner or subprocess.run)(
+            Cmd.zfs("get", "-H", "-o", "property,value", ",".join(props), dataset),
+            check=True,
+            capture_output=True,
+            text=True,
+            close_fds=False,
+        )
+        values = {}
+        for line in result.stdout.splitlines():
+            prop, _, value = line.partition("\t")
+            values[prop] = value
+        return values
+
+    @staticmethod
+    def run(cmd: list, logger: Logger, dry_run: bool = False, runner=None, **kwargs) -> None:
         logger.info(f"Running: {' '.join(cmd)}" + (" [dry-run]" if dry_run else ""))
         if not dry_run:
-            subprocess.run(cmd, check=True, **kwargs)
+            kwargs.setdefault("close_fds", False)
+            (runner or subprocess.run)(cmd, check=True, **kwargs)
 
     @staticmethod
     def verify_backup_file(file_path: Path, logger: Logger) -> bool:
@@ -556,6 +632,9 @@ class ZFS:
 
 # ========== Base Manager ==========
 class BaseManager:
+    # Allowed dataset characters: alphanumerics (as str.isalnum) plus "/", "_" and "-"
+    DATASET_CHARS_RE = re.compile(r"[\w/-]+")
+
     def __init__(self, args: Args, logger: Logger):
         self.args = args
         self.logger = logger
@@ -580,7 +659,7 @@ class BaseManager:
             raise ValidationError("Dataset name contains invalid path components")
 
         # Basic ZFS dataset name validation
-        if not all(c.isalnum() or c in "/_-" for c in dataset):
+        if not self.DATASET_CHARS_RE.fullmatch(dataset):
             raise ValidationError("Dataset name contains invalid characters")
 
         # Check length (ZFS has limits)
@@ -854,11 +933,15 @@ If this is not what you want, press Ctrl-C now.
 
 # ========== Main ==========
 class Main:
+    # argparse parser, built on first use and shared by every Main instance
+    _parser: argparse.ArgumentParser | None = None
+
     def __init__(self):
         self.logger: Logger = None
         self.args: Args = None
 
-    def parse_args(self) -> None:
+    @staticmethod
+    def build_parser() -> argparse.ArgumentParser:
         description = f"""
     {CONFIG.SCRIPT_ID} — Simple, atomic ZFS backup/restore with retention.
 
@@ -986,7 +1069,14 @@ CRON JOB EXAMPLES:
         )
         parser.add_argument("-f", "--force", action="store_true", help="Do not prompt for confirmation during restore")
         parser.add_argument("-v", "--verbose", action="store_true", help="Verbose logging")
-        ns = parser.parse_args()
+        return parser
+
+    def parse_args(self, argv: list[str] | None = None) -> None:
+        """Parse argv (default: sys.argv[1:]) into self.args and set up the logger."""
+        if Main._parser is None:
+            Main._parser = Main.build_parser()
+        parser = Main._parser
+        ns = parser.parse_args(argv)
         # Require action/dataset/mount_point to be provided
         missing = [a for a in ("action", "dataset", "mount_point") if getattr(ns, a, None) is None]
         if missing: